@@ -0,0 +1,42 @@
+"""Process-wide configuration read from Streamlit secrets.
+
+The LangChain tracing settings used to be exported when ``streamlit_app``
+was imported, so every page paid for them (and needed the secret) just to
+import a helper. They are now applied once, right before the first model
+is created.
+"""
+
+import logging
+import os
+import threading
+
+import streamlit as st
+
+LANGCHAIN_PROJECT = "SessionAthena"
+LANGCHAIN_ENDPOINT = "https://api.smith.langchain.com"
+
+logger = logging.getLogger(__name__)
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def configure() -> None:
+    """Export the LangChain tracing settings, once per process.
+
+    Tracing stays off when the LANGCHAIN_API_KEY secret is not set.
+    """
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        api_key = st.secrets.get('LANGCHAIN_API_KEY')
+        if api_key:
+            os.environ["LANGCHAIN_TRACING_V2"] = "true"
+            os.environ["LANGCHAIN_API_KEY"] = api_key
+            os.environ["LANGCHAIN_PROJECT"] = LANGCHAIN_PROJECT
+            os.environ['LANGCHAIN_ENDPOINT'] = LANGCHAIN_ENDPOINT
+        else:
+            logger.info("LANGCHAIN_API_KEY is not set; LangChain tracing is off")
+        _configured = True
@@ -0,0 +1,313 @@
+"""Headless batch analysis of many students' latest sessions.
+
+This module asks the same questions about the latest session of every magic
+link in a list, without the Streamlit UI. Session data is fetched with
+bounded concurrency, videos shared between students are downloaded once,
+and questions go to the model in concurrent batches. Results are appended
+to a JSONL file after every batch, which doubles as the checkpoint: rerunning
+the same command skips (link, question) pairs that already have an answer.
+
+    python batch_analytics.py links.txt questions.txt --output results.jsonl \\
+        --parquet results.parquet
+
+The OpenAI key is read from the OPENAI_API_KEY environment variable; the
+Google and LangChain settings come from .streamlit/secrets.toml as in the app.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from langchain_openai import ChatOpenAI
+
+from app_config import configure
+from context_builder import DEFAULT_CONTEXT_TOKEN_BUDGET, build_transcript_context
+from core_chat import create_llm_message
+from google_integration import PREFETCH, fetch_transcripts, request_priority
+from magiclink_chat import extract_video_id
+from session_api import SessionAPIError, get_session_api
+from streamlit_app import extract_yt_videos
+from token_accounting import usage_from_metadata
+
+# Batch settings
+FETCH_CONCURRENCY = 8
+LLM_CONCURRENCY = 16
+LLM_BATCH_SIZE = 64
+# Links processed together; bounds how many transcripts are held in memory
+LINK_GROUP_SIZE = 200
+MODEL_NAME = "gpt-4o-mini"
+
+SYSTEM_PROMPT = """
+You are a helpful and thoughtful session analysis coach who double-checks their work.
+What follows is an educational discussion between teacher and student.
+Answer the question about this session as well as you can, concisely.
+"""
+
+logger = logging.getLogger(__name__)
+
+class LatestSession(NamedTuple):
+    """The latest session with video of one magic link."""
+    link_id: str
+    session: Dict[str, Any]
+    video_ids: List[str]
+
+def read_lines(path: str) -> List[str]:
+    """Read non-empty, non-comment lines from a text file."""
+    return [
+        line.strip() for line in Path(path).read_text().splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+
+def load_checkpoint(output_path: str) -> Set[Tuple[str, str]]:
+    """Return the (link ID, question) pairs already answered in the output.
+
+    Rows that failed are not counted, so they are retried on resume.
+
+    Args:
+        output_path: JSONL results file from an earlier run
+
+    Returns:
+        Completed pairs
+    """
+    done = set()
+    path = Path(output_path)
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as results:
+        for line in results:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a partial last line
+                continue
+            if not row.get("error"):
+                done.add((row["link_id"], row["question"]))
+    return done
+
+def fetch_latest_session(link_id: str) -> Optional[LatestSession]:
+    """Find a link's latest session that has video.
+
+    Args:
+        link_id: The magic link identifier
+
+    Returns:
+        The latest session and its video IDs, or None if it has no video
+    """
+    sessions = extract_yt_videos(get_session_api().fetch_index(link_id))
+    if not sessions:
+        return None
+    latest = sessions[0]
+    video_ids = list(dict.fromkeys(extract_video_id(url) for url in latest['youtube_urls']))
+    return LatestSession(link_id, latest, video_ids)
+
+def fetch_latest_sessions(link_ids: List[str],
+                          concurrency: int = FETCH_CONCURRENCY) -> Iterator[Tuple[str, Any]]:
+    """Fetch the latest session of many links with bounded concurrency.
+
+    Args:
+        link_ids: Magic link identifiers
+        concurrency: Maximum number of session API requests in flight
+
+    Yields:
+        (link ID, LatestSession or None or the exception raised) in input order
+    """
+    def fetch(link_id: str) -> Any:
+        # Any failure is reported for its link instead of aborting the group
+        try:
+            return fetch_latest_session(link_id)
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(link_ids)))) as pool:
+        yield from zip(link_ids, pool.map(fetch, link_ids))
+
+def session_transcript(latest: LatestSession, transcripts: Dict[str, str]) -> str:
+    """Join the transcripts of a session's videos that were fetched."""
+    return "\n".join(transcripts[video_id] for video_id in latest.video_ids if video_id in transcripts)
+
+def append_rows(output_path: str, rows: List[Dict[str, Any]]) -> None:
+    """Append result rows to the JSONL file and flush them to disk."""
+    with open(output_path, "a", encoding="utf-8") as results:
+        for row in rows:
+            results.write(json.dumps(row, ensure_ascii=False) + "\n")
+        results.flush()
+        os.fsync(results.fileno())
+
+def write_parquet(jsonl_path: str, parquet_path: str) -> None:
+    """Convert the JSONL results to Parquet (needs pandas and pyarrow)."""
+    import pandas as pd
+
+    frame = pd.read_json(jsonl_path, lines=True)
+    # Resumed runs append retries after earlier failures; keep the latest row
+    frame = frame.drop_duplicates(["link_id", "question"], keep="last")
+    frame.to_parquet(parquet_path, index=False)
+
+def run_batch(link_ids: List[str], questions: List[str], output_path: str,
+              fetch_concurrency: int = FETCH_CONCURRENCY,
+              llm_concurrency: int = LLM_CONCURRENCY,
+              batch_size: int = LLM_BATCH_SIZE,
+              context_token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+              model_name: str = MODEL_NAME) -> Dict[str, int]:
+    """Answer every question about every link's latest session.
+
+    Args:
+        link_ids: Magic link identifiers
+        questions: Questions asked of each session
+        output_path: JSONL file that receives one row per (link, question)
+            and serves as the checkpoint
+        fetch_concurrency: Concurrent session API and transcript requests
+        llm_concurrency: Concurrent model calls
+        batch_size: Model calls written to the output per checkpoint
+        context_token_budget: Maximum transcript tokens sent per question
+        model_name: OpenAI chat model
+
+    Returns:
+        Counts of answered, failed and skipped pairs
+    """
+    done = load_checkpoint(output_path)
+    counts = {"answered": 0, "failed": 0, "skipped": 0}
+    unique_links = list(dict.fromkeys(link_ids))
+    pending_links = [
+        link_id for link_id in unique_links
+        if any((link_id, question) not in done for question in questions)
+    ]
+    counts["skipped"] = sum(
+        (link_id, question) in done for link_id in unique_links for question in questions
+    )
+
+    configure()
+    model = ChatOpenAI(model=model_name, temperature=0)
+    for start in range(0, len(pending_links), LINK_GROUP_SIZE):
+        group = pending_links[start:start + LINK_GROUP_SIZE]
+        _process_links(group, questions, done, output_path, model, counts,
+                       fetch_concurrency, llm_concurrency, batch_size, context_token_budget)
+        logger.info("Processed %d of %d links: %s",
+                    min(start + LINK_GROUP_SIZE, len(pending_links)), len(pending_links), counts)
+    return counts
+
+def _process_links(link_ids: List[str], questions: List[str], done: Set[Tuple[str, str]],
+                   output_path: str, model: ChatOpenAI, counts: Dict[str, int],
+                   fetch_concurrency: int, llm_concurrency: int, batch_size: int,
+                   context_token_budget: int) -> None:
+    """Fetch, ask and record one group of links; see run_batch."""
+    # Latest session of each link
+    sessions: List[LatestSession] = []
+    failures: List[Dict[str, Any]] = []
+    for link_id, result in fetch_latest_sessions(link_ids, fetch_concurrency):
+        if isinstance(result, LatestSession):
+            sessions.append(result)
+            continue
+        if result is None:
+            error = "no session with video"
+        elif isinstance(result, SessionAPIError):
+            error = f"session API: {result}"
+        else:
+            error = f"{type(result).__name__}: {result}"
+        failures.extend(
+            {"link_id": link_id, "session_id": None, "session_date": None, "video_ids": [],
+             "question": question, "error": error}
+            for question in questions if (link_id, question) not in done
+        )
+
+    # Transcripts, downloading videos shared between students once; the
+    # YouTube quota reserved for interactive requests is left to the app
+    video_ids = list(dict.fromkeys(video_id for latest in sessions for video_id in latest.video_ids))
+    transcripts: Dict[str, str] = {}
+    with request_priority(PREFETCH):
+        for result in fetch_transcripts(video_ids, max_workers=fetch_concurrency):
+            if result.error is not None:
+                logger.warning("Transcript %s unavailable: %s", result.video_id, result.error)
+            else:
+                transcripts[result.video_id] = "\n".join(result.transcript)
+
+    # One model request per pending (session, question)
+    jobs = []
+    for latest in sessions:
+        transcript = session_transcript(latest, transcripts)
+        missing_video_ids = [video_id for video_id in latest.video_ids if video_id not in transcripts]
+        for question in questions:
+            if (latest.link_id, question) in done:
+                continue
+            row = {
+                "link_id": latest.link_id,
+                "session_id": latest.session.get('session_id'),
+                "session_date": latest.session.get('date'),
+                "video_ids": latest.video_ids,
+                "question": question,
+            }
+            # Answering from part of a session would be checkpointed as done for
+            # good, so the pair fails and is retried on resume instead
+            if missing_video_ids:
+                failures.append(dict(
+                    row, missing_video_ids=missing_video_ids,
+                    error=f"transcript unavailable for {', '.join(missing_video_ids)}"
+                ))
+                continue
+            if not transcript:
+                failures.append(dict(row, error="no transcript available"))
+                continue
+            # Questions about a session share the whole-transcript prefix, which
+            # the provider's prompt cache reuses; excerpts follow it
+            context = build_transcript_context(transcript, question, context_token_budget)
+            excerpt = "" if context == transcript else context
+            messages = create_llm_message(
+                SYSTEM_PROMPT, "" if excerpt else transcript, str(latest.session),
+                [{"role": "user", "content": question}], excerpt=excerpt
+            )
+            jobs.append((row, messages))
+
+    if failures:
+        append_rows(output_path, failures)
+        counts["failed"] += len(failures)
+
+    for start in range(0, len(jobs), batch_size):
+        batch = jobs[start:start + batch_size]
+        responses = model.batch(
+            [messages for _, messages in batch],
+            config={"max_concurrency": llm_concurrency},
+            return_exceptions=True
+        )
+        rows = []
+        for (row, _), response in zip(batch, responses):
+            row = dict(row, model=model.model_name, processed_at=time.time())
+            if isinstance(response, Exception):
+                rows.append(dict(row, error=f"{type(response).__name__}: {response}"))
+                counts["failed"] += 1
+                continue
+            usage = usage_from_metadata(response.usage_metadata) or {}
+            rows.append(dict(row, answer=response.content, error=None, **usage))
+            counts["answered"] += 1
+        append_rows(output_path, rows)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ask questions about many students' latest sessions.")
+    parser.add_argument("links_file", help="File with one magic link ID per line")
+    parser.add_argument("questions_file", help="File with one question per line")
+    parser.add_argument("--output", default="batch_results.jsonl",
+                        help="JSONL results file; also the resume checkpoint")
+    parser.add_argument("--parquet", help="Also write the results to this Parquet file")
+    parser.add_argument("--fetch-concurrency", type=int, default=FETCH_CONCURRENCY)
+    parser.add_argument("--llm-concurrency", type=int, default=LLM_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=LLM_BATCH_SIZE)
+    parser.add_argument("--model", default=MODEL_NAME)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    counts = run_batch(
+        read_lines(args.links_file), read_lines(args.questions_file), args.output,
+        fetch_concurrency=args.fetch_concurrency,
+        llm_concurrency=args.llm_concurrency,
+        batch_size=args.batch_size,
+        model_name=args.model
+    )
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+    print(f"Batch finished: {counts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Latency of the shared cache backends and whether warm data crosses processes.
+
+For each backend this times writes and reads of a transcript-sized caption
+payload and a small JSON answer, then has a second interpreter store a value
+and checks that this process can read it (only the memory backend can't).
+Run from the repository root; pass a Redis URL to include a local server:
+
+    python benchmarks/bench_cache_backend.py --repeat 200
+    python benchmarks/bench_cache_backend.py --url redis://localhost:6379/15
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from cache_backend import backend_from_url  # noqa: E402
+from fixtures import make_sbv  # noqa: E402
+from latency import LatencyRecorder  # noqa: E402
+
+NAMESPACE = "benchmark"
+
+WRITER = """
+import sys
+from cache_backend import backend_from_url
+backend_from_url(sys.argv[1]).set(sys.argv[2], sys.argv[3], b"from another process", 60)
+"""
+
+def shared_across_processes(url: str) -> bool:
+    """Store a value from a fresh interpreter and try to read it here."""
+    key = uuid.uuid4().hex
+    subprocess.run([sys.executable, "-c", WRITER, url, NAMESPACE, key], cwd=ROOT, check=True)
+    backend = backend_from_url(url)
+    found = backend.get(NAMESPACE, key) is not None
+    backend.delete(NAMESPACE, key)
+    return found
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", action="append", help="Extra backend URL, such as redis://localhost:6379/15")
+    parser.add_argument("--repeat", type=int, default=100, help="Samples per operation")
+    parser.add_argument("--hours", type=float, default=1.0, help="Caption length in hours")
+    args = parser.parse_args()
+
+    caption = make_sbv(args.hours).encode("utf-8")
+    answer = {"answer": "They finished most of the homework and asked about overfitting.",
+              "created_at": 0.0}
+
+    with tempfile.TemporaryDirectory() as directory:
+        urls = ["memory://", f"sqlite:///{directory}/bench.sqlite3"] + (args.url or [])
+        failed = False
+        for url in urls:
+            backend = backend_from_url(url)
+            recorder = LatencyRecorder()
+            for sample in range(args.repeat):
+                with recorder.time("set caption"):
+                    backend.set(NAMESPACE, f"caption:{sample}", caption, 60)
+                with recorder.time("get caption"):
+                    backend.get(NAMESPACE, f"caption:{sample}")
+                with recorder.time("set answer"):
+                    backend.set_json(NAMESPACE, f"answer:{sample}", answer, 60)
+                with recorder.time("get answer"):
+                    backend.get_json(NAMESPACE, f"answer:{sample}")
+                with recorder.time("get missing"):
+                    backend.get(NAMESPACE, f"missing:{sample}")
+            backend.clear(NAMESPACE)
+
+            stats = backend.stats()
+            print(recorder.report(f"{url} ({len(caption) // 1024} KiB caption)"))
+            print(f"  shared across processes: {shared_across_processes(url)}, errors: {stats['errors']}\n")
+            failed = failed or bool(stats["errors"])
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
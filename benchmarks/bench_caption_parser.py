@@ -0,0 +1,87 @@
+"""Benchmark the caption parser against the original parse_transcript_text.
+
+Generates a multi-hour SBV caption payload, checks that both parsers agree,
+and reports the best-of-N time for each. Run from the repository root:
+
+    python benchmarks/bench_caption_parser.py --hours 4
+"""
+
+import argparse
+import io
+import sys
+import timeit
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from caption_parser import (  # noqa: E402
+    format_timestamp, format_transcript, iter_caption_segments, parse_captions
+)
+
+def legacy_parse_transcript_text(caption_data: str) -> List[str]:
+    """The original string-splitting parser, kept here as the baseline."""
+    def convert_time_to_ms(time_str):
+        hours, minutes, seconds, milliseconds = time_str.replace(".", ":").split(":")
+        return (int(hours) * 3600000 + int(minutes) * 60000 +
+                int(seconds) * 1000 + int(milliseconds))
+
+    transcript_segments = []
+    MIN_GAP_MS = 30 * 1000
+    last_timestamp_ms = -2 * MIN_GAP_MS
+    for block in caption_data.strip().split("\n\n"):
+        lines = block.split("\n")
+        if len(lines) >= 2:
+            text = lines[1]
+            if text == "e":
+                continue
+            timing = lines[0]
+            start_time, end_time = timing.split(",")
+            current_time_ms = convert_time_to_ms(start_time)
+            if current_time_ms - last_timestamp_ms > MIN_GAP_MS:
+                transcript_segments.append(f"<Timestamp: {start_time}>")
+                last_timestamp_ms = current_time_ms
+            transcript_segments.append(text)
+    transcript_segments.append(f"<Timestamp: {end_time}>")
+    return transcript_segments
+
+def make_sbv(hours: float, cue_ms: int = 2500) -> str:
+    """Build a synthetic SBV payload covering the given number of hours."""
+    # Like YouTube's SBV downloads, each cue ends where the next one starts
+    blocks = []
+    for number, start in enumerate(range(0, int(hours * 3600000), cue_ms)):
+        end = start + cue_ms
+        blocks.append(
+            f"{format_timestamp(start)},{format_timestamp(end)}\n"
+            f"and this is caption number {number} about gradient descent"
+        )
+    return "\n\n".join(blocks) + "\n"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=4.0, help="Caption length in hours")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    payload = make_sbv(args.hours)
+    payload_bytes = payload.encode("utf-8")
+    assert legacy_parse_transcript_text(payload) == format_transcript(parse_captions(payload))
+    assert parse_captions(payload) == list(iter_caption_segments(io.BytesIO(payload_bytes)))
+
+    cases = {
+        "legacy parse_transcript_text": lambda: legacy_parse_transcript_text(payload),
+        "parse_captions": lambda: parse_captions(payload),
+        "parse_captions + format_transcript": lambda: format_transcript(parse_captions(payload)),
+        "iter_caption_segments (64 KiB reads)": lambda: list(
+            iter_caption_segments(io.BytesIO(payload_bytes))
+        ),
+    }
+
+    print(f"{args.hours:g} h of captions, {len(payload_bytes) / 1e6:.1f} MB, "
+          f"{len(parse_captions(payload))} cues")
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f"  {name:<40} {best * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Per-turn overhead of the magic-link chat before and after fragment reruns.
+
+Drives ``magiclink_chat.py`` with ``streamlit.testing.AppTest`` against the
+fake services and reads the traces each run leaves in session state. AppTest
+always reruns the whole script, which is how every chat turn used to run;
+the page's "magic_link" trace minus its nested "chat_turn" trace is the work
+a full rerun does besides answering. In the app, a chat turn now reruns only
+the chat fragment, so that work is what each turn saves:
+
+    page_rerun_unmemoized  pipeline work per turn before this change
+    page_rerun_memoized    what a full rerun (other widgets) still costs
+    chat_turn              cost of a fragment rerun, model call included
+    chat_turn_overhead     fragment rerun time outside the model call
+
+Run from the repository root:
+
+    python benchmarks/bench_chat_turn.py --turns 10
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from fake_services import (  # noqa: E402
+    FakeServiceConfig, FakeServices, install_fake_services, sample_question
+)
+from fixtures import make_link_id  # noqa: E402
+from latency import LatencyRecorder  # noqa: E402
+
+APP_SCRIPT = ROOT / "magiclink_chat.py"
+
+def record_turn(app: AppTest, recorder: LatencyRecorder, page_stage: str) -> None:
+    """Split the last run's traces into page and chat turn time."""
+    traces = app.session_state["traces"]
+    chat_turn, page = traces[-2], traces[-1]
+    assert (chat_turn.name, page.name) == ("chat_turn", "magic_link"), (chat_turn.name, page.name)
+    model = sum(record.duration for record in chat_turn.spans if record.name.startswith("llm."))
+    recorder.record(page_stage, page.duration - chat_turn.duration)
+    recorder.record("chat_turn", chat_turn.duration)
+    recorder.record("chat_turn_overhead", chat_turn.duration - model)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10, help="Questions asked per mode")
+    parser.add_argument("--caption-hours", type=float, default=1.0, help="Length of each recording")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions in the magic link")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds per page run")
+    args = parser.parse_args()
+
+    config = FakeServiceConfig(caption_hours=args.caption_hours, sessions_per_link=args.sessions)
+    recorder = LatencyRecorder()
+
+    with FakeServices(config) as services:
+        install_fake_services(services.base_url)
+        app = AppTest.from_file(str(APP_SCRIPT), default_timeout=args.timeout)
+        app.secrets["OPENAI_API_KEY"] = "benchmark"
+        app.run()
+        app.sidebar.text_input[0].input(make_link_id(0))
+        with recorder.time("first_load"):
+            app.run()
+
+        # Answers come from the model, not the response cache
+        app.toggle[0].set_value(False)
+        app.run()
+
+        for turn in range(2 * args.turns):
+            memoized = turn >= args.turns
+            if not memoized:
+                # Forget the page load, as every rerun did before memoization
+                app.session_state["page_loads"] = {}
+            app.chat_input[0].set_value(sample_question(turn))
+            app.run()
+            record_turn(app, recorder,
+                        "page_rerun_memoized" if memoized else "page_rerun_unmemoized")
+
+    print(recorder.report(f"Chat turns ({args.turns} per mode)"))
+    if app.exception:
+        print(f"Page error: {app.exception[0].value}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
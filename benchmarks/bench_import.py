@@ -0,0 +1,120 @@
+"""Cold-start import cost and first-page latency of each app page.
+
+Every page is run once in a fresh interpreter started with ``-X importtime``,
+using ``streamlit.testing.AppTest``. For each page this reports:
+
+    process       wall time from interpreter start to the rendered page
+    page_imports  time spent importing modules the page itself pulled in
+                  (Streamlit and the test harness are loaded beforehand)
+    first_run     time of the page's first script run, imports included
+
+followed by the heaviest modules imported by the page. Run from the
+repository root:
+
+    python benchmarks/bench_import.py --repeat 3
+    python benchmarks/bench_import.py --page "pages/1_🎥_YouTube_Upload.py"
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PAGES = ["streamlit_app.py", "magiclink_chat.py"] + sorted(
+    str(path.relative_to(ROOT)) for path in (ROOT / "pages").glob("*.py")
+)
+
+# Printed to stderr between loading the harness and running the page
+PAGE_MARKER = "-- page run --"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+RUNNER = f"""
+import sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=60)
+app.secrets["OPENAI_API_KEY"] = "benchmark"
+print({PAGE_MARKER!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+app.run()
+print(f"first_run={{time.perf_counter() - start}}")
+for exception in app.exception:
+    print(f"exception={{exception.value}}")
+"""
+
+class PageImports(NamedTuple):
+    """Import timings of one page run."""
+    process: float
+    page_imports: float
+    first_run: float
+    modules: List[Tuple[str, float]]  # Top-level modules and cumulative seconds
+    errors: List[str]
+
+def run_page(page: str) -> PageImports:
+    """Run one page in a fresh interpreter and parse its import timings."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER, page],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    process = time.perf_counter() - start
+
+    modules = []
+    in_page = False
+    for line in result.stderr.splitlines():
+        if line == PAGE_MARKER:
+            in_page = True
+            continue
+        match = IMPORTTIME_LINE.match(line)
+        # Only imports at the top of the tree, so nested ones aren't counted twice
+        if in_page and match and not match.group(3):
+            modules.append((match.group(4), int(match.group(2)) / 1e6))
+
+    first_run = 0.0
+    errors = []
+    for line in result.stdout.splitlines():
+        if line.startswith("first_run="):
+            first_run = float(line.split("=", 1)[1])
+        elif line.startswith("exception="):
+            errors.append(line.split("=", 1)[1])
+    if result.returncode:
+        errors.append(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return PageImports(process, sum(seconds for _, seconds in modules), first_run, modules, errors)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", action="append", help="Page script to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per page")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest page imports to list")
+    args = parser.parse_args()
+
+    print(f"{'page':<40} {'process':>9} {'imports':>9} {'first_run':>9}  (ms, median of {args.repeat})")
+    failed = False
+    for page in args.page or DEFAULT_PAGES:
+        runs = [run_page(page) for _ in range(args.repeat)]
+        print(
+            f"{page:<40} {statistics.median(run.process for run in runs) * 1000:>9.0f} "
+            f"{statistics.median(run.page_imports for run in runs) * 1000:>9.0f} "
+            f"{statistics.median(run.first_run for run in runs) * 1000:>9.0f}"
+        )
+        heaviest: Dict[str, List[float]] = {}
+        for run in runs:
+            for module, seconds in run.modules:
+                heaviest.setdefault(module, []).append(seconds)
+        ranked = sorted(heaviest.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+        for module, samples in ranked[:args.top]:
+            print(f"    {module:<36} {statistics.median(samples) * 1000:>9.1f}")
+        for run in runs:
+            if run.errors:
+                failed = True
+                print(f"    error: {run.errors[0]}")
+                break
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Microbenchmarks for the transcript and prompt-building hot paths.
+
+Times caption parsing, transcript formatting, token counting, retrieval
+index builds, context selection and prompt assembly on synthetic inputs,
+and reports p50/p95/p99 per stage. Run from the repository root:
+
+    python benchmarks/bench_micro.py --hours 2 --repeat 30
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from caption_parser import format_transcript, parse_captions  # noqa: E402
+from context_builder import (  # noqa: E402
+    TranscriptIndex, build_transcript_context, chunk_transcript, get_transcript_index
+)
+from core_chat import create_llm_message  # noqa: E402
+from fixtures import make_sbv, make_session_payload  # noqa: E402
+from google_integration import parse_transcript_text  # noqa: E402
+from latency import LatencyRecorder  # noqa: E402
+from token_accounting import count_tokens, get_encoding  # noqa: E402
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=1.0, help="Caption length in hours")
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per stage")
+    args = parser.parse_args()
+
+    payload = make_sbv(args.hours)
+    transcript = "\n".join(parse_transcript_text(payload))
+    history = str(make_session_payload(0)["data"]["sessions"])
+    chat_messages = [
+        {"role": "user", "content": "How did the student do on the homework?"},
+        {"role": "assistant", "content": "They finished most of it and asked about overfitting."},
+    ]
+    question = "What did we say about the learning rate?"
+    encoding = get_encoding()
+
+    recorder = LatencyRecorder()
+    for sample in range(args.repeat):
+        with recorder.time("parse_captions"):
+            segments = parse_captions(payload)
+        with recorder.time("format_transcript"):
+            format_transcript(segments)
+        with recorder.time("parse_transcript_text"):
+            parse_transcript_text(payload)
+        with recorder.time("tiktoken encode (uncached)"):
+            len(encoding.encode(transcript))
+        with recorder.time("count_tokens (memoized)"):
+            count_tokens(transcript)
+        with recorder.time("chunk_transcript"):
+            chunks = chunk_transcript(transcript)
+        with recorder.time("TranscriptIndex build"):
+            TranscriptIndex(chunks)
+        if sample == 0:
+            get_transcript_index(transcript)
+        with recorder.time("build_transcript_context"):
+            context = build_transcript_context(transcript, question)
+        with recorder.time("create_llm_message"):
+            create_llm_message("You are a coach.", context, history, chat_messages)
+
+    print(f"{args.hours:g} h of captions, {len(payload) / 1e6:.1f} MB SBV, "
+          f"{len(transcript) / 1e6:.1f} MB transcript")
+    print(recorder.report(f"{args.repeat} samples per stage"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""Local stand-ins for the YouTube captions API, session API and OpenAI.
+
+One threaded HTTP server answers all three, adding configurable latency to
+each route so benchmarks see realistic timings and payload sizes without
+network access or credentials:
+
+    GET  /youtube/v3/captions?videoId=...     caption track listing
+    GET  /youtube/v3/captions/<caption id>    SBV caption download
+    GET  /one-on-one-student-info?linkId=...  student session payload
+    POST /v1/chat/completions                 chat completions (streaming or not),
+                                              reporting prompt-cache hits for
+                                              repeated message prefixes
+    POST /v1/embeddings                       embeddings
+
+``install_fake_services`` points the app's process-wide clients at the
+server, so anything run in the same process (including AppTest scripts)
+talks to it.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import random
+import struct
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import googleapiclient.discovery
+from google.auth.credentials import AnonymousCredentials
+
+import cache_backend
+import core_chat
+import google_integration
+import search_index
+import session_api
+import transcript_cache
+from google_integration import API_SERVICE_NAME, API_VERSION, YouTubeClientManager
+from fixtures import (
+    VOCABULARY, link_index_from_id, make_caption_text, make_sbv, make_session_payload
+)
+from latency import LatencyRecorder
+
+EMBEDDING_DIMENSIONS = 64
+
+class ServiceLatency(NamedTuple):
+    """Simulated latency: a fixed base plus an exponential tail, in milliseconds."""
+    base_ms: float
+    tail_ms: float
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one delay in seconds."""
+        tail = rng.expovariate(1 / self.tail_ms) if self.tail_ms > 0 else 0.0
+        return (self.base_ms + tail) / 1000
+
+class FakeServiceConfig(NamedTuple):
+    """Latencies and payload sizes served by the fake services."""
+    caption_list: ServiceLatency = ServiceLatency(120, 40)
+    caption_download: ServiceLatency = ServiceLatency(250, 150)
+    session_api: ServiceLatency = ServiceLatency(300, 200)
+    chat_first_token: ServiceLatency = ServiceLatency(400, 300)
+    chat_token_interval_ms: float = 15
+    embeddings: ServiceLatency = ServiceLatency(80, 40)
+    caption_hours: float = 1.0
+    sessions_per_link: int = 20
+    videos_per_session: int = 1
+    answer_words: int = 200
+
+@lru_cache(maxsize=256)
+def _caption_payload(video_id: str, hours: float) -> bytes:
+    """Build (once) the SBV download for a fake video."""
+    seed = int(hashlib.sha1(video_id.encode("utf-8")).hexdigest()[:8], 16)
+    return make_sbv(hours, seed=seed).encode("utf-8")
+
+@lru_cache(maxsize=256)
+def _session_payload(link_id: str, sessions: int, videos_per_session: int) -> bytes:
+    """Build (once) the session API response for a fake link."""
+    payload = make_session_payload(link_index_from_id(link_id), sessions, videos_per_session)
+    return json.dumps(payload).encode("utf-8")
+
+def _embedding(text: str) -> list:
+    """Deterministic unit vector for a text."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    rng = random.Random(digest)
+    vector = [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+    norm = sum(x * x for x in vector) ** 0.5
+    return [x / norm for x in vector]
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes requests for FakeServices; one instance per request."""
+
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        config = self.server.config
+        if url.path == "/youtube/v3/captions":
+            self._timed("captions.list", config.caption_list, self._caption_list, query)
+        elif url.path.startswith("/youtube/v3/captions/"):
+            caption_id = url.path.rsplit("/", 1)[-1]
+            self._timed("captions.download", config.caption_download,
+                        self._caption_download, caption_id)
+        elif url.path.endswith("/one-on-one-student-info"):
+            self._timed("session_api", config.session_api, self._session_info, query)
+        else:
+            self._send(404, b"{}")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = urlparse(self.path).path
+        if path.endswith("/chat/completions"):
+            start = time.perf_counter()
+            self._chat_completion(body)
+            self.server.recorder.record("chat.completions", time.perf_counter() - start)
+        elif path.endswith("/embeddings"):
+            self._timed("embeddings", self.server.config.embeddings, self._embeddings, body)
+        else:
+            self._send(404, b"{}")
+
+    def _timed(self, route: str, latency: ServiceLatency, handler: Any, arg: Any) -> None:
+        """Sleep for the route's simulated latency, answer, and record the time."""
+        start = time.perf_counter()
+        time.sleep(latency.sample(self.server.rng()))
+        handler(arg)
+        self.server.recorder.record(route, time.perf_counter() - start)
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json",
+              headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _caption_list(self, query: Dict[str, str]) -> None:
+        video_id = query.get("videoId", "")
+        body = {
+            "kind": "youtube#captionListResponse",
+            "items": [{
+                "kind": "youtube#caption",
+                "id": f"cap-{video_id}",
+                "snippet": {"videoId": video_id, "language": "en", "trackKind": "standard"}
+            }]
+        }
+        self._send(200, json.dumps(body).encode("utf-8"))
+
+    def _caption_download(self, caption_id: str) -> None:
+        video_id = caption_id[len("cap-"):]
+        self._send(200, _caption_payload(video_id, self.server.config.caption_hours),
+                   content_type="text/plain; charset=utf-8")
+
+    def _session_info(self, query: Dict[str, str]) -> None:
+        config = self.server.config
+        body = _session_payload(query.get("linkId", ""), config.sessions_per_link,
+                                config.videos_per_session)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send(200, body, headers={"ETag": etag})
+
+    def _embeddings(self, body: Dict[str, Any]) -> None:
+        inputs = body.get("input", [])
+        if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = []
+        for position, item in enumerate(inputs):
+            vector = _embedding(json.dumps(item))
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": position, "embedding": vector})
+        response = {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0}
+        }
+        self._send(200, json.dumps(response).encode("utf-8"))
+
+    def _cached_prompt_tokens(self, messages: list) -> int:
+        """Tokens of the longest message prefix sent before, as OpenAI reports them.
+
+        Like the real prompt cache, only prefixes of at least 1024 tokens
+        count, in steps of 128 tokens.
+        """
+        digest = hashlib.sha1()
+        chars = cached_chars = 0
+        for message in messages:
+            digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+            chars += len(str(message.get("content", "")))
+            if self.server.remember_prefix(digest.hexdigest()):
+                cached_chars = chars
+        tokens = cached_chars // 4
+        return tokens // 128 * 128 if tokens >= 1024 else 0
+
+    def _chat_completion(self, body: Dict[str, Any]) -> None:
+        config = self.server.config
+        rng = self.server.rng()
+        words = [rng.choice(VOCABULARY) for _ in range(config.answer_words)]
+        messages = body.get("messages", [])
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(words),
+            "total_tokens": prompt_chars // 4 + len(words),
+            "prompt_tokens_details": {"cached_tokens": self._cached_prompt_tokens(messages)}
+        }
+        base = {
+            "id": f"chatcmpl-{rng.getrandbits(48):x}",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini")
+        }
+        time.sleep(config.chat_first_token.sample(rng))
+
+        if not body.get("stream"):
+            response = dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }])
+            self._send(200, json.dumps(response).encode("utf-8"))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices: list, **extra: Any) -> None:
+            chunk = dict(base, object="chat.completion.chunk", choices=choices, **extra)
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for position, word in enumerate(words):
+            if position:
+                time.sleep(config.chat_token_interval_ms / 1000)
+            event([{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}])
+        event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            event([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: FakeServiceConfig,
+                 recorder: LatencyRecorder, seed: int):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.recorder = recorder
+        self._seed = seed
+        self._local = threading.local()
+        self._prefixes: set = set()
+        self._prefixes_lock = threading.Lock()
+
+    def remember_prefix(self, key: str) -> bool:
+        """Record a prompt prefix and return whether it was seen before."""
+        with self._prefixes_lock:
+            seen = key in self._prefixes
+            self._prefixes.add(key)
+            return seen
+
+    def rng(self) -> random.Random:
+        """Per-thread random generator, so handlers don't contend on a lock."""
+        rng = getattr(self._local, "rng", None)
+        if rng is None:
+            rng = self._local.rng = random.Random(self._seed + threading.get_ident())
+        return rng
+
+class FakeServices:
+    """Runs the fake services on a background thread.
+
+    Use as a context manager; ``recorder`` holds the server-side time spent
+    on each route, including the simulated latency.
+    """
+
+    def __init__(self, config: FakeServiceConfig = FakeServiceConfig(),
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.recorder = LatencyRecorder()
+        self._server = _Server((host, port), config, self.recorder, seed)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeServices":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+class LocalYouTubeClientManager(YouTubeClientManager):
+    """YouTube client manager that talks to FakeServices without credentials."""
+
+    def __init__(self, base_url: str):
+        """Create a manager for the fake captions API at ``base_url``."""
+        super().__init__()
+        self.base_url = base_url
+
+    def get_credentials(self) -> Any:
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = AnonymousCredentials()
+            return self._credentials
+
+    def get_client(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                self._client = googleapiclient.discovery.build(
+                    API_SERVICE_NAME,
+                    API_VERSION,
+                    credentials=self.get_credentials(),
+                    client_options={"api_endpoint": f"{self.base_url}/"},
+                    static_discovery=True,
+                    cache_discovery=False
+                )
+            return self._client
+
+def install_fake_services(base_url: str) -> None:
+    """Point the app's process-wide clients at the fake services.
+
+    Replaces the cache backend, session API client, YouTube client manager,
+    transcript cache and search index store (memory only, so runs start
+    cold and leave no files behind), chat model and answer cache
+    singletons, and routes OpenAI traffic through environment variables.
+
+    Args:
+        base_url: Address of a running FakeServices instance
+    """
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    os.environ["OPENAI_API_BASE"] = f"{base_url}/v1"
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+    backend = cache_backend.MemoryBackend()
+    cache_backend._backend = backend
+    session_api._client = session_api.SessionAPIClient(
+        base_url=f"{base_url}/one-on-one-student-info", backend=backend
+    )
+    google_integration._client_manager = LocalYouTubeClientManager(base_url)
+    google_integration.find_caption_id.cache_clear()
+    transcript_cache._cache = transcript_cache.TranscriptCache(backend=backend)
+    search_index._store = search_index.SearchIndexStore(backend=backend)
+    core_chat._chat_model = None
+    core_chat._response_cache = None
+
+def sample_question(seed: int = 0) -> str:
+    """A coach-style question about a fake transcript."""
+    return f"What did we say about {make_caption_text(random.Random(seed), words=3)}?"
@@ -0,0 +1,92 @@
+"""Synthetic payloads shaped like the app's real inputs.
+
+Caption tracks follow YouTube's SBV downloads (contiguous ~2.5 s cues of
+tutoring-style speech), and session payloads follow the
+one-on-one-student-info response, so benchmarks exercise realistic sizes.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from caption_parser import format_timestamp
+
+# Word pool for generated speech; mixes topic words with filler
+VOCABULARY = (
+    "so the gradient descent step moves the weights a little bit toward lower loss "
+    "and the learning rate controls how big that step is if it is too large "
+    "we overshoot the minimum and the loss starts to oscillate okay let us look at "
+    "the confusion matrix for the classifier precision recall accuracy overfitting "
+    "training data validation split neural network layer activation function "
+    "python notebook dataframe column feature label project deadline homework "
+    "next week we will present the results to your teacher does that make sense"
+).split()
+
+def make_caption_text(rng: random.Random, words: int = 12) -> str:
+    """Build one caption line of pseudo-random speech."""
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def make_sbv(hours: float, cue_ms: int = 2500, seed: int = 0) -> str:
+    """Build an SBV caption payload covering the given number of hours.
+
+    Args:
+        hours: Length of the recording
+        cue_ms: Duration of each cue in milliseconds
+        seed: Seed for the generated text
+
+    Returns:
+        SBV caption text
+    """
+    rng = random.Random(seed)
+    blocks = []
+    for start in range(0, int(hours * 3600000), cue_ms):
+        blocks.append(
+            f"{format_timestamp(start)},{format_timestamp(start + cue_ms)}\n"
+            f"{make_caption_text(rng)}"
+        )
+    return "\n\n".join(blocks) + "\n"
+
+def make_video_id(link_index: int, session_index: int, video_index: int) -> str:
+    """Build a stable 11-character fake YouTube video ID."""
+    return f"v{link_index:04d}{session_index:04d}{video_index:02d}"[:11]
+
+def make_session_payload(link_index: int, sessions: int = 20,
+                         videos_per_session: int = 1, seed: int = 0) -> Dict[str, Any]:
+    """Build a session API response for one magic link.
+
+    Args:
+        link_index: Number of the link; video IDs are unique per link
+        sessions: Number of sessions in the payload
+        videos_per_session: YouTube links per session
+        seed: Seed for the generated summaries
+
+    Returns:
+        Parsed JSON payload in the session API's shape
+    """
+    rng = random.Random(seed + link_index)
+    first_date = datetime(2024, 1, 6, 17, 0, tzinfo=timezone.utc)
+    payload_sessions: List[Dict[str, Any]] = []
+    for number in range(sessions):
+        date = first_date + timedelta(weeks=number)
+        payload_sessions.append({
+            "session_id": f"{link_index}-{number}",
+            "session_date": date.isoformat().replace("+00:00", "Z"),
+            "youtube_link": [
+                f"https://youtu.be/{make_video_id(link_index, number, video)}"
+                for video in range(videos_per_session)
+            ],
+            "instructor_names": ["Alex Rivera"],
+            "session_summary": [make_caption_text(rng, words=60) for _ in range(3)],
+            "project_name": "Image classifier",
+            "time_zone": "America/Los_Angeles",
+        })
+    rng.shuffle(payload_sessions)
+    return {"data": {"sessions": payload_sessions}}
+
+def make_link_id(link_index: int) -> str:
+    """Build a magic-link ID in the aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee format."""
+    return f"00000000-0000-4000-8000-{link_index:012d}"
+
+def link_index_from_id(link_id: str) -> int:
+    """Recover the link number from an ID built by make_link_id."""
+    return int(link_id.rsplit("-", 1)[-1])
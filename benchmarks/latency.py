@@ -0,0 +1,60 @@
+"""Thread-safe latency recording with percentile reports."""
+
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+PERCENTILES = (50, 95, 99)
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return math.nan
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class LatencyRecorder:
+    """Collects durations per stage from any number of threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Add one duration for a stage."""
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Record how long the body of a with-block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, mean and p50/p95/p99 in milliseconds per stage."""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+        summary = {}
+        for stage, values in samples.items():
+            row = {"count": len(values), "mean": sum(values) / len(values) * 1000}
+            for pct in PERCENTILES:
+                row[f"p{pct}"] = percentile(values, pct) * 1000
+            summary[stage] = row
+        return summary
+
+    def report(self, title: str) -> str:
+        """Format the summary as a fixed-width table."""
+        lines = [title, f"  {'stage':<36} {'n':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)"]
+        for stage, row in self.summary().items():
+            lines.append(
+                f"  {stage:<36} {row['count']:>6} {row['mean']:>9.1f} "
+                f"{row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,113 @@
+"""Concurrent-user load test of the magic-link page against fake services.
+
+Starts the local stand-ins from fake_services, points the app at them and
+drives ``magiclink_chat.py`` with ``streamlit.testing.AppTest`` from several
+simulated users at once. Each user opens the page, submits a magic link and
+asks questions. Three tables of p50/p95/p99 latencies are printed: per user
+step, per pipeline stage (from the page's "Load Timings" table) and per fake
+service route, followed by the share of prompt tokens the (fake) provider
+served from its prompt cache. Run from the repository root:
+
+    python benchmarks/load_test.py --users 8 --links 4 --questions 2
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from fake_services import (  # noqa: E402
+    FakeServiceConfig, FakeServices, install_fake_services, sample_question
+)
+from fixtures import make_link_id  # noqa: E402
+from latency import LatencyRecorder  # noqa: E402
+
+APP_SCRIPT = ROOT / "magiclink_chat.py"
+
+def read_stage_timings(app: AppTest, recorder: LatencyRecorder) -> None:
+    """Record the pipeline stages shown in the page's "Load Timings" table."""
+    for dataframe in app.dataframe:
+        table = dataframe.value
+        if list(table.columns) != ["stage", "seconds"]:
+            continue
+        for stage, seconds in zip(table["stage"], table["seconds"]):
+            # Per-video listing stages are reported together
+            recorder.record(str(stage).split(":", 1)[0], float(seconds))
+
+def run_user(user: int, args: argparse.Namespace, steps: LatencyRecorder,
+             stages: LatencyRecorder) -> Tuple[List[str], Dict[str, int]]:
+    """Simulate one user's visit.
+
+    Returns:
+        Errors the page raised and the chat's token totals
+    """
+    app = AppTest.from_file(str(APP_SCRIPT), default_timeout=args.timeout)
+    app.secrets["OPENAI_API_KEY"] = "benchmark"
+
+    with steps.time("first_render"):
+        app.run()
+    app.sidebar.text_input[0].input(make_link_id(user % args.links))
+    with steps.time("load_link"):
+        app.run()
+    read_stage_timings(app, stages)
+
+    for question in range(args.questions):
+        app.chat_input[0].set_value(sample_question(user * args.questions + question))
+        with steps.time("chat_turn"):
+            app.run()
+    totals = app.session_state["token_ledger"].totals() if args.questions else {}
+    return [str(exception.value) for exception in app.exception], totals
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8, help="Simulated users")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="Users running at once (default: all)")
+    parser.add_argument("--links", type=int, default=4,
+                        help="Distinct magic links shared by the users")
+    parser.add_argument("--questions", type=int, default=2, help="Questions per user")
+    parser.add_argument("--caption-hours", type=float, default=1.0, help="Length of each recording")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions per magic link")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds per page run")
+    args = parser.parse_args()
+
+    config = FakeServiceConfig(caption_hours=args.caption_hours, sessions_per_link=args.sessions)
+    steps, stages = LatencyRecorder(), LatencyRecorder()
+    errors: List[str] = []
+    tokens = {"prompt_tokens": 0, "cached_tokens": 0}
+
+    with FakeServices(config) as services:
+        install_fake_services(services.base_url)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency or args.users) as pool:
+            futures = [
+                pool.submit(run_user, user, args, steps, stages) for user in range(args.users)
+            ]
+            for future in futures:
+                user_errors, totals = future.result()
+                errors.extend(user_errors)
+                for key in tokens:
+                    tokens[key] += totals.get(key, 0)
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.users} users, {args.links} links, {args.questions} questions each, "
+          f"{elapsed:.1f} s wall time")
+    print(steps.report("User steps"))
+    print(stages.report("Pipeline stages"))
+    print(services.recorder.report("Fake service routes (server side)"))
+    if tokens["prompt_tokens"]:
+        print(f"Prompt cache: {tokens['cached_tokens']} of {tokens['prompt_tokens']} prompt tokens "
+              f"cached ({tokens['cached_tokens'] / tokens['prompt_tokens']:.0%})")
+    if errors:
+        print(f"{len(errors)} page errors, first: {errors[0]}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
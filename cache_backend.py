@@ -0,0 +1,522 @@
+"""Pluggable storage shared by the app's caches across processes and replicas.
+
+The transcript cache, the session API client and the answer cache keep a
+small in-process tier in front of a ``CacheBackend``. The backend is chosen
+by the ``MAGICLINK_CACHE_URL`` environment variable:
+
+    memory://                      process-local, nothing is shared
+    sqlite:///magiclink_cache.sqlite3
+                                   SQLite file shared by processes on one node
+                                   (the default)
+    redis://[:password@]host:port/db
+                                   any server speaking the Redis protocol,
+                                   shared by every replica
+
+Backend failures are logged and treated as misses, so an unreachable cache
+server slows the app down to uncached speed instead of breaking pages.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+# Backend settings
+CACHE_URL_ENV = "MAGICLINK_CACHE_URL"
+DEFAULT_DB_PATH = "magiclink_cache.sqlite3"
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_DISK_ENTRIES = 20000
+SQLITE_TIMEOUT_SECONDS = 5.0
+# Reads refresh a row's access time at most this often, so most hits stay read-only
+ACCESS_UPDATE_SECONDS = 60.0
+REDIS_PORT = 6379
+REDIS_TIMEOUT_SECONDS = 0.5
+REDIS_POOL_SIZE = 16
+KEY_PREFIX = "magiclink"
+# Seconds a failing backend is skipped before it is tried again
+RETRY_AFTER_SECONDS = 5.0
+
+logger = logging.getLogger(__name__)
+
+class RedisError(Exception):
+    """Raised when a Redis server replies with an error or breaks the protocol."""
+
+class CacheBackend:
+    """Byte values keyed by namespace and key, with an optional TTL.
+
+    Subclasses implement the underscored methods; the public ones count
+    hits and misses, and turn storage errors into misses.
+    """
+
+    name = "backend"
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "errors": 0}
+        self._down_until = 0.0
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Return a stored value, or None if it is missing, expired or unreachable.
+
+        Args:
+            namespace: Which cache the key belongs to, such as "transcript"
+            key: Key within the namespace
+        """
+        value = self._guard(self._get, namespace, key)
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, namespace: str, key: str, value: bytes,
+            ttl_seconds: Optional[float] = None) -> None:
+        """Store a value.
+
+        Args:
+            namespace: Which cache the key belongs to
+            key: Key within the namespace
+            value: Bytes to store
+            ttl_seconds: Seconds until the value expires, or None to keep it
+                until it is evicted
+        """
+        self._guard(self._set, namespace, key, value, ttl_seconds)
+        self._count("sets")
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove a value if it is stored."""
+        self._guard(self._delete, namespace, key)
+
+    def exists(self, namespace: str, key: str) -> bool:
+        """Check whether a non-expired value is stored, without counting a hit."""
+        return bool(self._guard(self._exists, namespace, key))
+
+    def clear(self, namespace: str) -> None:
+        """Remove every value in a namespace."""
+        self._guard(self._clear, namespace)
+
+    def get_json(self, namespace: str, key: str) -> Any:
+        """Return a value stored with set_json, or None."""
+        value = self.get(namespace, key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError as error:
+            self._count("errors")
+            logger.warning("Dropping unreadable %s value %s from the %s cache backend: %s",
+                           namespace, key, self.name, error)
+            self.delete(namespace, key)
+            return None
+
+    def set_json(self, namespace: str, key: str, value: Any,
+                 ttl_seconds: Optional[float] = None) -> None:
+        """Store a JSON-serializable value."""
+        self.set(namespace, key, json.dumps(value).encode("utf-8"), ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss, write and error counters."""
+        with self._stats_lock:
+            return dict(self._stats, backend=self.name)
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _guard(self, operation, *args: Any) -> Any:
+        """Run a storage operation, logging failures and returning None instead."""
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return operation(*args)
+        except (OSError, sqlite3.Error, RedisError) as error:
+            self._count("errors")
+            self._down_until = time.monotonic() + RETRY_AFTER_SECONDS
+            logger.warning("%s cache backend failed, skipping it for %.0fs: %s",
+                           self.name, RETRY_AFTER_SECONDS, error)
+            return None
+        except (zlib.error, ValueError) as error:
+            # A damaged value is a miss, not a sign the backend is down
+            self._count("errors")
+            logger.warning("Unreadable value in the %s cache backend: %s", self.name, error)
+            return None
+
+    def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float]) -> None:
+        raise NotImplementedError
+
+    def _delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def _exists(self, namespace: str, key: str) -> bool:
+        raise NotImplementedError
+
+    def _clear(self, namespace: str) -> None:
+        raise NotImplementedError
+
+class MemoryBackend(CacheBackend):
+    """LRU dictionary in process memory; nothing is shared between processes."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = DEFAULT_MEMORY_ENTRIES):
+        """Create an empty backend.
+
+        Args:
+            max_entries: Number of values kept across all namespaces
+        """
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Optional[float], bytes]]" = OrderedDict()
+
+    def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def _set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float]) -> None:
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._entries[(namespace, key)] = (expires_at, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def _exists(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            return entry is not None and (entry[0] is None or entry[0] > time.time())
+
+    def _clear(self, namespace: str) -> None:
+        with self._lock:
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+                del self._entries[entry_key]
+
+class DiskBackend(CacheBackend):
+    """Compressed values in a SQLite file that every process on the node can open.
+
+    The database runs in WAL mode so readers in other processes are not
+    blocked by a writer. Expired rows are dropped on write, then the least
+    recently read rows over ``max_entries``; access times are approximate to
+    within ``ACCESS_UPDATE_SECONDS``.
+    """
+
+    name = "disk"
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_entries: int = DEFAULT_DISK_ENTRIES):
+        """Open (or create) the database.
+
+        Args:
+            db_path: SQLite file to store values in
+            max_entries: Number of values kept across all namespaces
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT_SECONDS, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS cache_entries (
+                   namespace TEXT NOT NULL,
+                   key TEXT NOT NULL,
+                   expires_at REAL,
+                   accessed_at REAL NOT NULL,
+                   value BLOB NOT NULL,
+                   PRIMARY KEY (namespace, key)
+               )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed_at)"
+        )
+        self._db.commit()
+
+    def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT expires_at, accessed_at, value FROM cache_entries "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            expires_at, accessed_at, value = row
+            if expires_at is not None and expires_at <= now:
+                self._db.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+                )
+                self._db.commit()
+                return None
+            if now - accessed_at >= ACCESS_UPDATE_SECONDS:
+                self._db.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+                self._db.commit()
+        return zlib.decompress(value)
+
+    def _set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float]) -> None:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        compressed = zlib.compress(value)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, expires_at, now, compressed)
+            )
+            self._db.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                """DELETE FROM cache_entries WHERE rowid IN (
+                       SELECT rowid FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,)
+            )
+            self._db.commit()
+
+    def _delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+            self._db.commit()
+
+    def _exists(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM cache_entries WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time())
+            ).fetchone() is not None
+
+    def _clear(self, namespace: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            self._db.commit()
+
+class _RedisConnection:
+    """One socket to a Redis server, speaking RESP2."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def command(self, *args: Any) -> Any:
+        """Send one command and return its decoded reply."""
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def close(self) -> None:
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Redis server closed the connection")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(body.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Redis server closed the connection")
+            return data[:-2]
+        if kind == b"*":
+            count = int(body)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply from Redis server: {line[:32]!r}")
+
+class RedisBackend(CacheBackend):
+    """Compressed values on a Redis-protocol server, shared by every replica.
+
+    Uses a small pool of plain sockets, so no client library is needed.
+    Keys are ``<prefix>:<namespace>:<key>`` and expire through the server's
+    own TTLs; eviction is left to the server's ``maxmemory-policy``.
+    """
+
+    name = "redis"
+
+    def __init__(self, host: str = "localhost", port: int = REDIS_PORT, db: int = 0,
+                 password: Optional[str] = None, username: Optional[str] = None,
+                 prefix: str = KEY_PREFIX, timeout: float = REDIS_TIMEOUT_SECONDS,
+                 pool_size: int = REDIS_POOL_SIZE):
+        """Create a backend; connections are opened on first use.
+
+        Args:
+            host: Server host name
+            port: Server port
+            db: Database number selected on each connection
+            password: Password for AUTH, if the server requires one
+            username: ACL user name for AUTH, if any
+            prefix: Prefix of every key, so several apps can share a server
+            timeout: Connect and read timeout in seconds
+            pool_size: Idle connections kept open
+        """
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.username = username
+        self.prefix = prefix
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._idle: List[_RedisConnection] = []
+
+    def _get(self, namespace: str, key: str) -> Optional[bytes]:
+        value = self._command("GET", self._key(namespace, key))
+        return zlib.decompress(value) if value is not None else None
+
+    def _set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float]) -> None:
+        args = ["SET", self._key(namespace, key), zlib.compress(value)]
+        if ttl_seconds is not None:
+            args += ["PX", max(1, int(ttl_seconds * 1000))]
+        self._command(*args)
+
+    def _delete(self, namespace: str, key: str) -> None:
+        self._command("DEL", self._key(namespace, key))
+
+    def _exists(self, namespace: str, key: str) -> bool:
+        return self._command("EXISTS", self._key(namespace, key)) == 1
+
+    def _clear(self, namespace: str) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self._key(namespace, "*"), "COUNT", 500)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == b"0":
+                break
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _command(self, *args: Any) -> Any:
+        """Run a command on a pooled connection, retrying once if it went stale."""
+        for attempt in range(2):
+            connection, reused = self._checkout()
+            try:
+                reply = connection.command(*args)
+            except RedisError:
+                # The connection is still usable after an error reply
+                self._checkin(connection)
+                raise
+            except OSError:
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            self._checkin(connection)
+            return reply
+
+    def _checkout(self) -> Tuple[_RedisConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        connection = _RedisConnection(self.host, self.port, self.timeout)
+        try:
+            if self.password is not None:
+                auth = ["AUTH", self.username, self.password] if self.username else ["AUTH", self.password]
+                connection.command(*auth)
+            if self.db:
+                connection.command("SELECT", self.db)
+        except (OSError, RedisError):
+            connection.close()
+            raise
+        return connection, False
+
+    def _checkin(self, connection: _RedisConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+def backend_from_url(url: str) -> CacheBackend:
+    """Create a backend from a cache URL.
+
+    Args:
+        url: "memory://", "sqlite:///<path>" or "redis://[[user]:password@]host[:port][/db]"
+
+    Returns:
+        The configured backend
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryBackend()
+    if parsed.scheme == "sqlite":
+        # sqlite:///relative.db and sqlite:////absolute/path.db
+        return DiskBackend(url[len("sqlite:///"):] or DEFAULT_DB_PATH)
+    if parsed.scheme == "redis":
+        return RedisBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or REDIS_PORT,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=unquote(parsed.password) if parsed.password else None,
+            username=unquote(parsed.username) if parsed.username else None
+        )
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+def get_cache_backend() -> CacheBackend:
+    """Return the process-wide backend named by MAGICLINK_CACHE_URL, creating it on first use.
+
+    If the URL is not set and the default SQLite file can't be opened (for
+    example in a read-only working directory), the caches fall back to
+    process memory. A URL that is set but unusable raises instead.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                url = os.environ.get(CACHE_URL_ENV)
+                if url:
+                    _backend = backend_from_url(url)
+                else:
+                    try:
+                        _backend = DiskBackend(DEFAULT_DB_PATH)
+                    except (OSError, sqlite3.Error) as error:
+                        logger.warning("Could not open %s, caching in process memory only: %s",
+                                       DEFAULT_DB_PATH, error)
+                        _backend = MemoryBackend()
+    return _backend
@@ -0,0 +1,193 @@
+"""Caption parsing into structured transcript segments.
+
+This module parses SBV (the YouTube caption download default), SRT and
+WebVTT caption payloads into compact segments with start/end times in
+milliseconds. Payloads can be parsed whole or incrementally from a byte
+stream, and segments can be formatted into the timestamped transcript lines
+used by the chat interface.
+"""
+
+import codecs
+import re
+from typing import BinaryIO, Iterable, Iterator, List, Union
+
+# Minimum gap between <Timestamp: ...> markers in formatted transcripts
+TIMESTAMP_GAP_MS = 30 * 1000
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+READ_SIZE = 64 * 1024
+
+class CaptionSegment:
+    """One caption cue with times in milliseconds."""
+
+    __slots__ = ("start_ms", "end_ms", "text")
+
+    def __init__(self, start_ms: int, end_ms: int, text: str):
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"CaptionSegment({self.start_ms}, {self.end_ms}, {self.text!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CaptionSegment):
+            return NotImplemented
+        return (self.start_ms, self.end_ms, self.text) == (other.start_ms, other.end_ms, other.text)
+
+def parse_timestamp_ms(value: str) -> int:
+    """Convert an SBV, SRT or WebVTT timestamp to milliseconds.
+
+    Args:
+        value: Timestamp such as '0:01:02.500', '00:01:02,500' or '01:02.500'
+
+    Returns:
+        Time in milliseconds
+    """
+    if len(value) >= 9 and value[-4] in ".," and value[-7] == ":":
+        # Fixed-width fast path for [H...:]MM:SS.mmm: read all digits as one
+        # integer HMMSSmmm and split it arithmetically
+        digits = int(value.replace(":", "").replace(".", "").replace(",", ""))
+        return (digits % 100000 + (digits // 100000) % 100 * 60000
+                + digits // 10000000 * 3600000)
+
+    clock, _, fraction = value.replace(",", ".").partition(".")
+    parts = clock.split(":")
+    total = int(parts[-1]) * 1000 + int(parts[-2]) * 60000 + int(fraction[:3].ljust(3, "0"))
+    if len(parts) == 3:
+        total += int(parts[0]) * 3600000
+    return total
+
+def _parse_text(caption_text: str) -> List[CaptionSegment]:
+    """Parse every cue in newline-normalized caption text.
+
+    Cues are separated by blank lines. A cue's timing line is either SBV
+    ("start,end") or SRT/WebVTT ("start --> end [settings]"), optionally
+    preceded by an SRT index or WebVTT cue identifier. Blocks without a
+    timing line (WEBVTT headers, NOTE and STYLE blocks) are skipped.
+    """
+    segments = []
+    append = segments.append
+    to_ms = parse_timestamp_ms
+    # Consecutive cues usually share a boundary, so reuse the previous end
+    previous_end, previous_end_ms = "", 0
+    for block in caption_text.split("\n\n"):
+        timing, _, text = block.strip("\n").partition("\n")
+        if "-->" in timing:
+            start, _, end = timing.partition("-->")
+            end = end.split(None, 1)[0] if end.strip() else end
+        elif "," in timing and timing[:1].isdigit():
+            start, _, end = timing.partition(",")
+        elif "-->" in text.partition("\n")[0]:
+            # SRT index or WebVTT cue identifier before the timing line
+            timing, _, text = text.partition("\n")
+            start, _, end = timing.partition("-->")
+            end = end.split(None, 1)[0] if end.strip() else end
+        else:
+            continue
+
+        if "\n" in text:
+            text = " ".join(line.strip() for line in text.split("\n") if line.strip())
+        else:
+            text = text.strip()
+        if "<" in text:
+            text = TAG_PATTERN.sub("", text)
+        if not text:
+            continue
+        start, end = start.strip(), end.strip()
+        try:
+            start_ms = previous_end_ms if start == previous_end else to_ms(start)
+            end_ms = to_ms(end)
+        except (ValueError, IndexError):
+            continue  # Not a timing line after all
+        previous_end, previous_end_ms = end, end_ms
+        append(CaptionSegment(start_ms, end_ms, text))
+    return segments
+
+def parse_captions(caption_data: Union[str, bytes]) -> List[CaptionSegment]:
+    """Parse a complete SBV, SRT or WebVTT payload.
+
+    Args:
+        caption_data: Caption payload as text or UTF-8 bytes
+
+    Returns:
+        List of segments in payload order; empty for empty input
+    """
+    if isinstance(caption_data, bytes):
+        caption_data = caption_data.decode("utf-8-sig")
+    if "\r" in caption_data:
+        caption_data = caption_data.replace("\r\n", "\n")
+    return _parse_text(caption_data)
+
+def iter_caption_segments(stream: Union[BinaryIO, Iterable[bytes]],
+                          encoding: str = "utf-8-sig") -> Iterator[CaptionSegment]:
+    """Parse captions incrementally from a byte stream.
+
+    Only complete cues (those followed by a blank line) are parsed as data
+    arrives; the remainder is parsed when the stream ends.
+
+    Args:
+        stream: Binary file object or iterable of byte chunks
+        encoding: Text encoding of the payload
+
+    Yields:
+        Segments in payload order
+    """
+    if hasattr(stream, "read"):
+        chunks: Iterable[bytes] = iter(lambda: stream.read(READ_SIZE), b"")
+    else:
+        chunks = stream
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        if "\r" in pending:
+            pending = pending.replace("\r\n", "\n")
+        boundary = pending.rfind("\n\n")
+        if boundary == -1:
+            continue
+        complete, pending = pending[:boundary + 1], pending[boundary + 2:]
+        yield from _parse_text(complete)
+
+    pending += decoder.decode(b"", final=True)
+    yield from _parse_text(pending.replace("\r\n", "\n"))
+
+def format_timestamp(ms: int) -> str:
+    """Format milliseconds as 'H:MM:SS.mmm', the SBV timestamp format.
+
+    Args:
+        ms: Time in milliseconds
+
+    Returns:
+        Formatted timestamp
+    """
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+def format_transcript(segments: List[CaptionSegment],
+                      min_gap_ms: int = TIMESTAMP_GAP_MS) -> List[str]:
+    """Format segments as transcript lines with periodic timestamp markers.
+
+    Args:
+        segments: Parsed caption segments
+        min_gap_ms: Minimum time between <Timestamp: ...> markers
+
+    Returns:
+        List of transcript lines; empty when there are no segments
+    """
+    lines = []
+    last_timestamp_ms = -2 * min_gap_ms
+    for segment in segments:
+        if segment.text == "e":  # Skip empty segments
+            continue
+        if segment.start_ms - last_timestamp_ms > min_gap_ms:
+            lines.append(f"<Timestamp: {format_timestamp(segment.start_ms)}>")
+            last_timestamp_ms = segment.start_ms
+        lines.append(segment.text)
+
+    if segments:
+        lines.append(f"<Timestamp: {format_timestamp(segments[-1].end_ms)}>")
+    return lines
@@ -0,0 +1,128 @@
+"""Rolling compaction of long chat conversations.
+
+This module keeps the most recent chat turns verbatim and folds older turns
+into a running summary. Summaries are produced on a background thread after
+each reply, so compaction never delays the answer the user is waiting for.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from token_accounting import TOKENS_PER_MESSAGE, count_tokens
+
+# History compaction settings
+DEFAULT_KEEP_TURNS = 6
+DEFAULT_MAX_HISTORY_TOKENS = 6000
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a session analysis
+coach and an assistant. Merge the existing summary with the new exchanges.
+Keep questions asked, conclusions reached, numbers and names. Be concise.
+"""
+
+# Shared by all conversations in the process; summaries are short calls
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+logger = logging.getLogger(__name__)
+
+class ConversationHistory:
+    """Recent chat turns plus a running summary of everything older.
+
+    Store one instance per chat in ``st.session_state``. Call ``window``
+    before each model call and ``schedule_compaction`` after each reply.
+    """
+
+    def __init__(self, keep_turns: int = DEFAULT_KEEP_TURNS,
+                 max_history_tokens: int = DEFAULT_MAX_HISTORY_TOKENS):
+        """Create an empty history.
+
+        Args:
+            keep_turns: Number of recent question/answer turns kept verbatim
+            max_history_tokens: Hard ceiling on summary plus verbatim messages
+        """
+        self.keep_turns = keep_turns
+        self.max_history_tokens = max_history_tokens
+        self.summary = ""
+        self.summarized_count = 0  # Leading messages already folded into the summary
+        self._lock = threading.Lock()
+        self._pending: Optional[Future] = None
+
+    def window(self, chat_messages: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Return the summary and the messages to send verbatim.
+
+        Messages not yet folded into the summary are included verbatim, oldest
+        dropped first when the token ceiling is reached. The latest message is
+        always kept.
+
+        Args:
+            chat_messages: Full chat history, oldest first
+
+        Returns:
+            Tuple containing:
+                - Summary of the messages that were folded away
+                - Messages to send verbatim, oldest first
+        """
+        with self._lock:
+            summary, start = self.summary, self.summarized_count
+
+        if start > len(chat_messages):
+            # Chat was cleared since the summary was written
+            summary, start = "", 0
+
+        recent = chat_messages[start:]
+        budget = self.max_history_tokens - (count_tokens(summary) if summary else 0)
+        costs = [count_tokens(message["content"]) + TOKENS_PER_MESSAGE for message in recent]
+
+        # Drop the oldest verbatim messages until the ceiling is met
+        first = 0
+        total = sum(costs)
+        while total > budget and first < len(recent) - 1:
+            total -= costs[first]
+            first += 1
+        return summary, recent[first:]
+
+    def schedule_compaction(self, chat_messages: List[Dict[str, Any]], model: Any) -> None:
+        """Fold turns older than the verbatim window into the summary.
+
+        The summary is produced on a background thread; until it finishes,
+        ``window`` keeps returning the previous summary and the unfolded turns.
+
+        Args:
+            chat_messages: Full chat history, oldest first
+            model: Chat model used to write the summary
+        """
+        cut = len(chat_messages) - 2 * self.keep_turns
+        with self._lock:
+            if cut <= self.summarized_count:
+                return
+            if self._pending is not None and not self._pending.done():
+                return
+            summary, start = self.summary, self.summarized_count
+            to_fold = [dict(message) for message in chat_messages[start:cut]]
+            self._pending = _summary_executor.submit(
+                self._compact, model, summary, to_fold, cut
+            )
+
+    def _compact(self, model: Any, summary: str,
+                 to_fold: List[Dict[str, Any]], cut: int) -> None:
+        """Summarize folded messages and publish the new summary.
+
+        A failed summary call is logged and leaves the summary unchanged, so
+        the next turn tries again.
+        """
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in to_fold)
+        try:
+            response = model.invoke([
+                SystemMessage(content=SUMMARY_PROMPT),
+                HumanMessage(content=f"Existing summary:\n{summary}\n\nNew exchanges:\n{transcript}")
+            ])
+        except Exception as error:
+            logger.warning("Chat history compaction failed: %s", error)
+            return
+        with self._lock:
+            self.summary = response.content
+            self.summarized_count = cut
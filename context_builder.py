@@ -0,0 +1,278 @@
+"""Token-budgeted transcript context for the chat model.
+
+This module splits transcripts on the ``<Timestamp: ...>`` markers written by
+``parse_transcript_text``, builds a BM25 index over the chunks once per
+transcript, and selects the chunks most relevant to a question within a
+token budget.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from token_accounting import count_tokens
+from tracing import span, traced
+
+# Context selection settings
+DEFAULT_CONTEXT_TOKEN_BUDGET = 24000
+DEFAULT_TOP_K = 40
+MAX_CACHED_INDEXES = 32
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TIMESTAMP_PATTERN = re.compile(r"<Timestamp: ([^>]*)>")
+TERM_PATTERN = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by did do does for from had has have he her his "
+    "how i in is it its me my of on or our she so that the their them there "
+    "they this to was we were what when where which who why will with you your".split()
+)
+
+class TranscriptChunk(NamedTuple):
+    """A run of transcript text that starts at one timestamp marker."""
+    timestamp: str
+    text: str
+    tokens: int
+
+def tokenize_terms(text: str) -> List[str]:
+    """Split text into lowercase search terms, dropping stopwords.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of search terms
+    """
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+def chunk_transcript(transcript: str) -> List[TranscriptChunk]:
+    """Split a transcript into chunks at its timestamp markers.
+
+    Args:
+        transcript: Transcript text with inline <Timestamp: ...> markers
+
+    Returns:
+        List of chunks in transcript order; text before the first marker
+        forms a chunk with an empty timestamp
+    """
+    chunks = []
+    pieces = TIMESTAMP_PATTERN.split(transcript)
+    # split() alternates text and captured timestamps: text, ts, text, ts, text...
+    leading = pieces[0].strip()
+    if leading:
+        chunks.append(TranscriptChunk("", leading, count_tokens(leading)))
+    for timestamp, text in zip(pieces[1::2], pieces[2::2]):
+        text = text.strip()
+        if text:
+            chunks.append(TranscriptChunk(timestamp, text, count_tokens(text)))
+    return chunks
+
+class TranscriptIndex:
+    """BM25 index over the chunks of one transcript.
+
+    Terms map to postings lists of (chunk position, term frequency), so a
+    query only touches the chunks that contain its terms.
+    """
+
+    def __init__(self, chunks: List[TranscriptChunk]):
+        """Index the given chunks.
+
+        Args:
+            chunks: Transcript chunks in order
+        """
+        self.chunks = chunks
+        self.total_tokens = sum(chunk.tokens for chunk in chunks)
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for position, chunk in enumerate(chunks):
+            counts = Counter(tokenize_terms(chunk.text))
+            self._lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                self._postings[term].append((position, freq))
+        self._postings = dict(self._postings)
+        self._finish()
+
+    def _finish(self) -> None:
+        """Derive the length normalization and IDF tables from the postings."""
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        total = len(self.chunks)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def _sparse_scores(self, query: str) -> Dict[int, float]:
+        """BM25 scores of the chunks that match at least one query term."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize_terms(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for position, freq in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[position] / (self._average_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+        return scores
+
+    def score(self, query: str) -> List[float]:
+        """Score every chunk against a query with BM25.
+
+        Args:
+            query: Free-text question
+
+        Returns:
+            One score per chunk, in chunk order
+        """
+        scores = [0.0] * len(self.chunks)
+        for position, score in self._sparse_scores(query).items():
+            scores[position] = score
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Find the chunks that best match a query.
+
+        Args:
+            query: Keywords or free-text question
+            limit: Maximum number of results, or None for all matches
+
+        Returns:
+            (chunk position, score) pairs, best first; ties keep transcript order
+        """
+        ranked = sorted(self._sparse_scores(query).items(), key=lambda item: (-item[1], item[0]))
+        return ranked if limit is None else ranked[:limit]
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Return the index as JSON-serializable data for persistence."""
+        return {
+            "chunks": [list(chunk) for chunk in self.chunks],
+            "lengths": self._lengths,
+            "postings": {
+                term: [value for posting in postings for value in posting]
+                for term, postings in self._postings.items()
+            }
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "TranscriptIndex":
+        """Rebuild an index from ``to_payload`` data without re-tokenizing.
+
+        Args:
+            payload: Data returned by to_payload
+
+        Returns:
+            The restored index
+        """
+        index = cls.__new__(cls)
+        index.chunks = [TranscriptChunk(*chunk) for chunk in payload["chunks"]]
+        index.total_tokens = sum(chunk.tokens for chunk in index.chunks)
+        index._lengths = payload["lengths"]
+        index._postings = {
+            term: list(zip(flat[::2], flat[1::2])) for term, flat in payload["postings"].items()
+        }
+        index._finish()
+        return index
+
+_indexes: "OrderedDict[str, TranscriptIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def _transcript_key(transcript: str) -> str:
+    """Digest identifying a transcript's text."""
+    return hashlib.sha1(transcript.encode("utf-8")).hexdigest()
+
+def remember_transcript_index(transcript: str, index: TranscriptIndex) -> None:
+    """Cache an index built or loaded elsewhere for a transcript.
+
+    Args:
+        transcript: Transcript text the index was built from
+        index: Index to serve from get_transcript_index
+    """
+    key = _transcript_key(transcript)
+    with _indexes_lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+
+def get_transcript_index(transcript: str) -> TranscriptIndex:
+    """Return the index for a transcript, building it once per distinct text.
+
+    Args:
+        transcript: Transcript text with inline <Timestamp: ...> markers
+
+    Returns:
+        Cached TranscriptIndex for the transcript
+    """
+    key = _transcript_key(transcript)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    with span("context.index_build", chars=len(transcript)):
+        index = TranscriptIndex(chunk_transcript(transcript))
+    remember_transcript_index(transcript, index)
+    return index
+
+def _spread_order(count: int) -> List[int]:
+    """Order chunk positions so any prefix samples the transcript evenly."""
+    order, seen = [], set()
+    step = count
+    while step >= 1 and len(order) < count:
+        for position in range(0, count, step):
+            if position not in seen:
+                seen.add(position)
+                order.append(position)
+        step //= 2
+    return order
+
+@traced("context.select")
+def build_transcript_context(transcript: str, question: str,
+                             token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+                             top_k: int = DEFAULT_TOP_K) -> str:
+    """Select the transcript text to send to the model for one question.
+
+    The whole transcript is returned when it fits the budget. Otherwise the
+    top-k BM25 chunks that fit are returned in transcript order with their
+    timestamp markers. Questions that match no transcript terms (such as
+    "summarize the session") get chunks sampled evenly across the session.
+
+    Args:
+        transcript: Transcript text with inline <Timestamp: ...> markers
+        question: The user's current question
+        token_budget: Maximum number of transcript tokens to include
+        top_k: Maximum number of chunks to include when trimming
+
+    Returns:
+        Transcript text that fits within the token budget
+    """
+    index = get_transcript_index(transcript)
+    if index.total_tokens <= token_budget:
+        return transcript
+
+    ranked = [position for position, score in index.search(question) if score > 0]
+    if not ranked:
+        ranked = _spread_order(len(index.chunks))
+
+    selected, used = [], 0
+    for position in ranked:
+        if len(selected) >= top_k:
+            break
+        chunk = index.chunks[position]
+        if used + chunk.tokens > token_budget:
+            continue
+        selected.append(position)
+        used += chunk.tokens
+
+    parts = []
+    for position in sorted(selected):
+        chunk = index.chunks[position]
+        if chunk.timestamp:
+            parts.append(f"<Timestamp: {chunk.timestamp}>")
+        parts.append(chunk.text)
+    return "\n".join(parts)
@@ -4,34 +4,97 @@ This module provides the core chat functionality for interacting with transcript
 and session histories using LangChain and Streamlit.
 """
 
+import threading
+import time
 import streamlit as st
-import tiktoken
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from typing import List, Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from app_config import configure
+from cache_backend import get_cache_backend
+from chat_history import ConversationHistory
+from context_builder import DEFAULT_CONTEXT_TOKEN_BUDGET, build_transcript_context
+from response_cache import ResponseCache
+from search_index import format_search_results, parse_search_query, search_transcripts
+from token_accounting import ChatTokenLedger, cache_hit_rate, count_tokens, usage_from_metadata
+from tracing import record_span, span, start_trace
+
+# LangChain is slow to import, so it is loaded when the first question is
+# asked rather than when the chat first renders
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+    from langchain_openai import ChatOpenAI
+
+# Chat model settings
+CHAT_MODEL = "gpt-4o-mini"
+# Connections kept open to OpenAI, shared by every session
+CHAT_POOL_SIZE = 32
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide answer cache, creating it on first use.
+
+    Near-duplicate questions are matched with OpenAI embeddings, and exact
+    matches are shared with other processes through the cache backend.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                from langchain_openai import OpenAIEmbeddings
+
+                embeddings = OpenAIEmbeddings(
+                    model="text-embedding-3-small",
+                    api_key=st.secrets['OPENAI_API_KEY']
+                )
+                _response_cache = ResponseCache(
+                    embed=embeddings.embed_query, backend=get_cache_backend()
+                )
+    return _response_cache
 
 def create_llm_message(system_prompt: str, transcript: str, history: str, 
-                      chat_messages: List[Dict[str, str]]) -> List[SystemMessage | HumanMessage | AIMessage]:
+                      chat_messages: List[Dict[str, str]],
+                      conversation_summary: str = "",
+                      excerpt: str = "") -> List["SystemMessage | HumanMessage | AIMessage"]:
     """Create a list of LangChain messages for the LLM conversation.
 
+    The parts that stay the same across turns and users come first, in a
+    fixed order: system prompt, transcript, history. The provider's prompt
+    cache can then reuse that prefix; what changes per question follows it.
+
     Args:
         system_prompt: The initial system prompt defining the assistant's role
-        transcript: The session transcript text
+        transcript: The whole session transcript text, or "" when only an
+            excerpt is sent
         history: Previous session history
         chat_messages: List of previous chat messages with roles and content
+        conversation_summary: Summary of earlier chat turns not included
+            in chat_messages
+        excerpt: Transcript excerpt selected for the latest message, sent
+            right before it
 
     Returns:
         List of LangChain message objects for the conversation
     """
-    llm_messages = [
-        SystemMessage(content=system_prompt),
-        SystemMessage(content=f"Transcript: {transcript}")
-    ]
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+    llm_messages = [SystemMessage(content=system_prompt)]
+    
+    if transcript:
+        llm_messages.append(SystemMessage(content=f"Transcript: {transcript}"))
     
     if len(history) > 1:
         llm_messages.append(SystemMessage(content=f"History: {history}"))
     
-    for msg in chat_messages:
+    if conversation_summary:
+        llm_messages.append(SystemMessage(
+            content=f"Summary of the earlier conversation: {conversation_summary}"
+        ))
+    
+    for position, msg in enumerate(chat_messages):
+        if excerpt and position == len(chat_messages) - 1:
+            llm_messages.append(SystemMessage(content=f"Transcript excerpts: {excerpt}"))
         if msg["role"] == "user":
             llm_messages.append(HumanMessage(content=msg['content']))
         elif msg["role"] == "assistant":
@@ -39,17 +102,100 @@ def create_llm_message(system_prompt: str, transcript: str, history: str,
             
     return llm_messages
 
-def chat_with_transcript_history(transcript: str, history: str = "") -> None:
+_chat_model: Optional["ChatOpenAI"] = None
+_chat_model_lock = threading.Lock()
+
+def get_chat_model() -> "ChatOpenAI":
+    """Return the process-wide chat model, creating it on first use.
+
+    The model and its pool of HTTP connections to OpenAI are shared by every
+    session, so connections stay warm across turns and users.
+    """
+    global _chat_model
+    if _chat_model is None:
+        with _chat_model_lock:
+            if _chat_model is None:
+                import httpx
+                from langchain_openai import ChatOpenAI
+                from openai import DefaultHttpxClient
+
+                configure()
+                _chat_model = ChatOpenAI(
+                    model=CHAT_MODEL,
+                    temperature=0,
+                    api_key=st.secrets['OPENAI_API_KEY'],
+                    stream_usage=True,
+                    http_client=DefaultHttpxClient(limits=httpx.Limits(
+                        max_connections=CHAT_POOL_SIZE,
+                        max_keepalive_connections=CHAT_POOL_SIZE
+                    ))
+                )
+    return _chat_model
+
+def stream_response(model: "ChatOpenAI", llm_messages: List["BaseMessage"],
+                    latency: Dict[str, float],
+                    usage: Optional[Dict[str, int]] = None) -> Iterator[str]:
+    """Stream the model's answer chunk by chunk while recording latency.
+
+    Args:
+        model: Chat model to query
+        llm_messages: Messages to send to the model
+        latency: Dictionary that receives 'time_to_first_token' and 'total'
+            in seconds once the stream is consumed
+        usage: Optional dictionary that receives prompt_tokens,
+            cached_tokens and completion_tokens if the provider reports usage
+
+    Yields:
+        Text fragments of the answer as they arrive
+    """
+    start = time.perf_counter()
+    try:
+        for chunk in model.stream(llm_messages):
+            if usage is not None and chunk.usage_metadata:
+                usage.update(usage_from_metadata(chunk.usage_metadata))
+            if not chunk.content:
+                continue
+            if "time_to_first_token" not in latency:
+                latency["time_to_first_token"] = time.perf_counter() - start
+            yield chunk.content
+    except Exception as error:
+        record_span("llm.stream", time.perf_counter() - start, type(error).__name__)
+        raise
+    latency["total"] = time.perf_counter() - start
+    latency.setdefault("time_to_first_token", latency["total"])
+    # Timed by hand because the span would otherwise straddle the yields
+    record_span("llm.stream", latency["total"],
+                time_to_first_token=round(latency["time_to_first_token"], 3),
+                cached_tokens=(usage or {}).get("cached_tokens", 0))
+
+@st.fragment
+@start_trace("chat_turn", state=st.session_state)
+def chat_with_transcript_history(transcript: str, history: str = "",
+                                 stream: bool = True,
+                                 context_token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+                                 use_response_cache: bool = True,
+                                 transcripts: Optional[Dict[str, str]] = None) -> None:
     """Create an interactive chat interface for analyzing session transcripts.
 
+    The interface is a fragment: submitting a question or flipping one of its
+    switches reruns only this function, with the arguments of the last full
+    run, so the page's data loading is not repeated for every turn. Each run
+    is recorded as a "chat_turn" trace.
+
     Args:
         transcript: The session transcript to analyze
         history: Optional previous session history
+        stream: Render the answer token by token instead of waiting for it
+        context_token_budget: Maximum transcript tokens sent per question;
+            longer transcripts are reduced to the most relevant chunks
+        use_response_cache: Default for the switch that answers repeated
+            questions from the answer cache
+        transcripts: The individual transcripts combined in ``transcript``,
+            by video ID; enables the map-reduce answer mode and jump links
+            in search results
     """
-    # Calculate token count for the transcript
-    encoding = tiktoken.get_encoding("cl100k_base")
-    tokens = encoding.encode(transcript)
-    num_tokens = len(tokens)
+    # Calculate token count for the transcript (memoized across reruns)
+    num_tokens = count_tokens(transcript)
 
     SYSTEM_PROMPT = """
     You are a helpful and thoughtful session analysis coach who double-checks their work. 
@@ -67,19 +213,32 @@ def chat_with_transcript_history(transcript: str, history: str = "") -> None:
         "assistant": "🎓"
     }
 
-    # Initialize the chat model
-    model = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0,
-        api_key=st.secrets['OPENAI_API_KEY']
-    )
-
     # Initialize session state for messages if not exists
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "token_ledger" not in st.session_state:
+        st.session_state.token_ledger = ChatTokenLedger()
+    ledger = st.session_state.token_ledger
+    if "conversation_history" not in st.session_state:
+        st.session_state.conversation_history = ConversationHistory()
+    conversation = st.session_state.conversation_history
 
     # Display transcript statistics
     st.write(f"Transcript Character count={len(transcript)}, tokens={num_tokens}")
+    totals = ledger.totals()
+    if totals["turns"]:
+        st.caption(
+            f"Chat history tokens={ledger.sync(st.session_state.messages)}, "
+            f"prompt tokens used={totals['prompt_tokens']} "
+            f"({cache_hit_rate(totals):.0%} from the prompt cache), "
+            f"completion tokens used={totals['completion_tokens']}"
+        )
+
+    use_response_cache = st.toggle("Reuse cached answers", value=use_response_cache)
+    map_reduce = bool(transcripts) and st.toggle(
+        "Read every transcript in parallel (map-reduce)",
+        value=num_tokens > context_token_budget
+    )
 
     # Display existing chat messages
     for message in st.session_state.messages:
@@ -90,26 +249,136 @@ def chat_with_transcript_history(transcript: str, history: str = "") -> None:
 
     # Handle new user input
     if user_input := st.chat_input("Ask about this session"):
+        search_query = parse_search_query(user_input)
+        
+        # Look for an answer to the same question against the same context
+        cached_answer = None
+        if use_response_cache:
+            response_cache = get_response_cache()
+            cache_scope = ResponseCache.scope(transcript, history, st.session_state.messages)
+            if search_query is None:
+                with span("response_cache.lookup"):
+                    cached_answer = response_cache.lookup(cache_scope, user_input)
+        
         # Add user message to chat history
         st.session_state.messages.append({"role": "user", "content": user_input})
         
-        # Create LLM messages and get response
-        llm_messages = create_llm_message(
-            SYSTEM_PROMPT, transcript, history, st.session_state.messages
-        )
-        
         # Display user message
         with st.chat_message("user"):
             st.markdown(user_input)
         
-        # Get and display assistant response
-        with st.chat_message("assistant", avatar=AVATARS["assistant"]):
-            response = model.invoke(llm_messages)
-            assistant_response = response.content
-            st.markdown(assistant_response)
+        # Keyword lookups are answered from the search index, without the model
+        if search_query is not None:
+            start = time.perf_counter()
+            hits = search_transcripts(transcripts or {"": transcript}, search_query)
+            search_answer = format_search_results(hits, search_query)
+            with st.chat_message("assistant", avatar=AVATARS["assistant"]):
+                st.markdown(search_answer)
+                st.caption(f"Searched the transcript in {(time.perf_counter() - start) * 1000:.1f} ms")
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": search_answer,
+                "search": True
+            })
+            ledger.sync(st.session_state.messages)
+            return
+        
+        if cached_answer is not None:
+            with st.chat_message("assistant", avatar=AVATARS["assistant"]):
+                st.markdown(cached_answer)
+                st.caption("Answered from cache")
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": cached_answer,
+                "cached": True
+            })
+            ledger.sync(st.session_state.messages)
+            return
+        
+        # Shared across sessions
+        model = get_chat_model()
+        
+        # Keep recent turns verbatim and older ones as a running summary
+        conversation_summary, recent_messages = conversation.window(st.session_state.messages)
+        
+        latency: Dict[str, Any] = {}
+        usage: Dict[str, int] = {}
+        if map_reduce:
+            from map_reduce_chat import split_transcripts, stream_map_reduce
+            
+            # Ask each transcript part concurrently, then combine the answers
+            parts = split_transcripts(transcripts, context_token_budget)
+            reduce_history = history
+            if conversation_summary:
+                reduce_history = f"{history}\nSummary of the earlier conversation: {conversation_summary}"
+            with st.chat_message("assistant", avatar=AVATARS["assistant"]):
+                assistant_response = st.write_stream(stream_map_reduce(
+                    model, user_input, parts, reduce_history, recent_messages[:-1], latency, usage
+                ))
+                st.caption(
+                    f"Read {len(parts)} transcript parts in {latency['map']:.2f}s, "
+                    f"first token {latency['time_to_first_token']:.2f}s, "
+                    f"total {latency['total']:.2f}s"
+                )
+            # Fall back to local counts when the provider reports no usage
+            if not usage:
+                usage = {
+                    "prompt_tokens": sum(part.tokens for part in parts),
+                    "completion_tokens": count_tokens(assistant_response)
+                }
+        else:
+            # Select the transcript chunks relevant to this question
+            context = build_transcript_context(transcript, user_input, context_token_budget)
+            
+            # Create LLM messages and get response. The whole transcript is part
+            # of the cacheable prefix; an excerpt changes with every question.
+            excerpt = "" if context == transcript else context
+            llm_messages = create_llm_message(
+                SYSTEM_PROMPT, "" if excerpt else transcript, history, recent_messages,
+                conversation_summary, excerpt
+            )
+            
+            # Get and display assistant response
+            with st.chat_message("assistant", avatar=AVATARS["assistant"]):
+                if stream:
+                    assistant_response = st.write_stream(
+                        stream_response(model, llm_messages, latency, usage)
+                    )
+                else:
+                    start = time.perf_counter()
+                    with span("llm.invoke"):
+                        response = model.invoke(llm_messages)
+                    latency["total"] = latency["time_to_first_token"] = time.perf_counter() - start
+                    usage.update(usage_from_metadata(response.usage_metadata) or {})
+                    assistant_response = response.content
+                    st.markdown(assistant_response)
+                prompt_cache = f", {cache_hit_rate(usage):.0%} of the prompt cached" if usage else ""
+                st.caption(
+                    f"First token {latency['time_to_first_token']:.2f}s, "
+                    f"total {latency['total']:.2f}s{prompt_cache}"
+                )
+            
+            # Fall back to local counts when the provider reports no usage
+            if not usage:
+                usage = {
+                    "prompt_tokens": sum(
+                        count_tokens(str(message.content)) for message in llm_messages
+                    ),
+                    "completion_tokens": count_tokens(assistant_response)
+                }
         
         # Add assistant response to chat history
         st.session_state.messages.append({
             "role": "assistant", 
-            "content": assistant_response
-        })
\ No newline at end of file
+            "content": assistant_response,
+            "latency": latency,
+            "usage": ledger.record_turn(
+                usage["prompt_tokens"], usage["completion_tokens"], usage.get("cached_tokens", 0)
+            )
+        })
+        ledger.sync(st.session_state.messages)
+        if use_response_cache:
+            response_cache.store(cache_scope, user_input, assistant_response)
+        
+        # Fold older turns into the summary in the background
+        conversation.schedule_compaction(st.session_state.messages, model)
\ No newline at end of file
@@ -1,18 +1,76 @@
 """Google API integration for YouTube transcript retrieval.
 
 This module handles authentication with Google APIs and provides functionality
-to fetch and parse YouTube video transcripts.
+to fetch and parse YouTube video transcripts. Every YouTube Data API call goes
+through a process-wide quota scheduler that coalesces identical concurrent
+calls and spends the daily quota on interactive requests before prefetching.
 """
 
 import streamlit as st
+import contextvars
+import itertools
 import json
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from typing import List, Dict, Union
-import googleapiclient.discovery
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple, Union
+)
 from pathlib import Path
 
-def get_google_creds(credential_file_path: str) -> Credentials:
+from caption_parser import CaptionSegment, format_transcript, parse_captions
+from tracing import bind, record_span, span, traced
+from transcript_cache import get_transcript_cache
+
+# The Google client libraries are slow to import, so they are loaded on
+# first use rather than when a page imports this module
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+# YouTube Data API settings
+API_SERVICE_NAME = "youtube"
+API_VERSION = "v3"
+AUTH_FILE = "my2credentials.json"
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+MAX_CACHED_CAPTION_IDS = 4096
+
+# Batch transcript fetching settings
+MAX_FETCH_WORKERS = 8
+MAX_FETCH_RETRIES = 4
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+# YouTube Data API quota, in units per day (override with MAGICLINK_YOUTUBE_QUOTA)
+DAILY_QUOTA_UNITS = 10000
+CAPTIONS_LIST_COST = 50
+CAPTIONS_DOWNLOAD_COST = 200
+QUOTA_ERROR_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+# Share of the quota bucket that only interactive requests may spend
+PREFETCH_RESERVE_FRACTION = 0.25
+
+# Request priorities, most urgent first
+INTERACTIVE = 0
+PREFETCH = 1
+# Longest a request waits in line for quota before giving up
+MAX_QUOTA_WAIT_SECONDS = {INTERACTIVE: 20.0, PREFETCH: 120.0}
+
+logger = logging.getLogger(__name__)
+
+class TranscriptResult(NamedTuple):
+    """Outcome of fetching one video's transcript in a batch."""
+    video_id: str
+    transcript: Optional[List[str]]
+    error: Optional[Exception]
+
+@traced("google.load_credentials")
+def get_google_creds(credential_file_path: str) -> "Credentials":
     """Get or create Google API credentials.
 
     Args:
@@ -25,7 +83,7 @@ def get_google_creds(credential_file_path: str) -> Credentials:
     
     # Create credentials file if it doesn't exist
     if not filepath.exists():
-        print(f"Creating credentials file: {credential_file_path}")
+        logger.info("Creating credentials file: %s", credential_file_path)
         # Parse scopes from string to proper JSON array
         scopes = json.loads(st.secrets['scopes'])
         
@@ -40,7 +98,10 @@ def get_google_creds(credential_file_path: str) -> Credentials:
         content = json.dumps(credentials_data, indent=2)
         filepath.write_text(content)
     else:
-        print(f"Using existing credentials from: {credential_file_path}")
+        logger.debug("Using existing credentials from: %s", credential_file_path)
+
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
 
     # Load and validate credentials
     credentials = Credentials.from_authorized_user_file(credential_file_path)
@@ -49,6 +110,389 @@ def get_google_creds(credential_file_path: str) -> Credentials:
 
     return credentials
 
+class YouTubeClientManager:
+    """Process-wide owner of the Google credentials and YouTube API client.
+
+    Credentials are read from disk once and refreshed shortly before they
+    expire. The discovery document is built once from the static copy bundled
+    with google-api-python-client. Because httplib2 connections are not
+    thread-safe, requests are executed through a per-thread authorized HTTP
+    object that shares the same credentials.
+    """
+
+    def __init__(self, credential_file_path: str = AUTH_FILE,
+                 refresh_margin: timedelta = TOKEN_REFRESH_MARGIN):
+        """Create a manager; nothing is loaded until first use.
+
+        Args:
+            credential_file_path: Path to the credentials JSON file
+            refresh_margin: How long before expiry the token is refreshed
+        """
+        self.credential_file_path = credential_file_path
+        self.refresh_margin = refresh_margin
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._credentials: Optional["Credentials"] = None
+        self._client = None
+
+    def get_credentials(self) -> "Credentials":
+        """Return valid credentials, refreshing them if they expire soon."""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = get_google_creds(self.credential_file_path)
+            if self._needs_refresh(self._credentials):
+                from google.auth.transport.requests import Request
+
+                with span("google.token_refresh"):
+                    self._credentials.refresh(Request())
+            return self._credentials
+
+    def get_client(self) -> Any:
+        """Return the shared YouTube API client, building it on first use."""
+        with self._lock:
+            if self._client is None:
+                import googleapiclient.discovery
+
+                self._client = googleapiclient.discovery.build(
+                    API_SERVICE_NAME,
+                    API_VERSION,
+                    credentials=self.get_credentials(),
+                    static_discovery=True,
+                    cache_discovery=False
+                )
+            return self._client
+
+    def execute(self, request: Any) -> Any:
+        """Execute an API request on this thread's authorized connection.
+
+        Args:
+            request: An HttpRequest produced by the shared client
+
+        Returns:
+            The decoded API response
+        """
+        credentials = self.get_credentials()
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+
+            http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+            self._local.http = http
+        return request.execute(http=http)
+
+    def _needs_refresh(self, credentials: "Credentials") -> bool:
+        """Check whether the token is missing or inside the refresh margin."""
+        if not credentials.refresh_token:
+            return False
+        if credentials.token is None or credentials.expiry is None:
+            return not credentials.valid
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - self.refresh_margin <= now
+
+class QuotaExceededError(Exception):
+    """Raised when a YouTube request can't get quota within its wait limit."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+_request_priority: "contextvars.ContextVar[int]" = contextvars.ContextVar(
+    "youtube_request_priority", default=INTERACTIVE
+)
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run the YouTube requests made in a with-block at the given priority.
+
+    Args:
+        priority: INTERACTIVE (the default) or PREFETCH
+    """
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+def run_with_priority(priority: int, func: Callable[..., Any], *args: Any) -> Any:
+    """Call a function with its YouTube requests at the given priority."""
+    with request_priority(priority):
+        return func(*args)
+
+class _Flight:
+    """One API call in progress, shared by every caller of the same request."""
+    __slots__ = ("future", "priority", "sequence")
+
+    def __init__(self, priority: int, sequence: int):
+        self.future: Future = Future()
+        self.priority = priority
+        self.sequence = sequence
+
+class QuotaScheduler:
+    """Process-wide gate in front of YouTube Data API calls.
+
+    Identical concurrent calls share one request (single flight). Each
+    request first takes its quota cost from a token bucket that refills at
+    the daily quota rate. Waiting requests are served interactive first,
+    then in arrival order, and prefetch requests may not dip into the
+    reserve kept for interactive ones. When the bucket runs dry, or the API
+    itself reports the quota exhausted, requests wait in line for it to
+    refill and raise QuotaExceededError only if that would take longer than
+    their wait limit.
+    """
+
+    def __init__(self, units_per_day: float = DAILY_QUOTA_UNITS,
+                 capacity: Optional[float] = None,
+                 reserve_fraction: float = PREFETCH_RESERVE_FRACTION):
+        """Create a scheduler with a full bucket.
+
+        Args:
+            units_per_day: Quota units the bucket regains per day
+            capacity: Most units the bucket holds; defaults to a day's quota
+            reserve_fraction: Share of the capacity reserved for interactive
+                requests
+        """
+        self.capacity = units_per_day if capacity is None else capacity
+        self.refill_per_second = units_per_day / 86400
+        self.reserve = self.capacity * reserve_fraction
+
+        self._condition = threading.Condition()
+        self._tokens = float(self.capacity)
+        self._refilled_at = time.monotonic()
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._waiting: List[_Flight] = []
+        self._sequence = itertools.count()
+        self._stats = {"calls": 0, "coalesced": 0, "waited": 0, "quota_errors": 0, "rejected": 0}
+
+    def run(self, key: Tuple[str, str], cost: float, func: Callable[[], Any]) -> Any:
+        """Make an API call once quota allows, sharing it with identical callers.
+
+        Args:
+            key: Identifies the request, such as ("captions.list", video_id)
+            cost: Quota units the call uses
+            func: Makes the call
+
+        Returns:
+            What func returned, possibly to another caller of the same key
+
+        Raises:
+            QuotaExceededError: If quota won't be available within the wait
+                limit of the request's priority
+        """
+        priority = _request_priority.get()
+        with self._condition:
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = _Flight(priority, next(self._sequence))
+            else:
+                # Wait for the call in flight, hurrying it if this caller is more urgent
+                self._stats["coalesced"] += 1
+                if priority < flight.priority:
+                    flight.priority = priority
+                    self._condition.notify_all()
+        if not owner:
+            return flight.future.result()
+
+        try:
+            result = self._call(flight, cost, func)
+        except BaseException as error:
+            flight.future.set_exception(error)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            with self._condition:
+                del self._flights[key]
+
+    def stats(self) -> Dict[str, float]:
+        """Return call counters and the units currently in the bucket."""
+        with self._condition:
+            self._refill()
+            return dict(self._stats, quota_units=round(self._tokens), waiting=len(self._waiting),
+                        in_flight=len(self._flights))
+
+    def _call(self, flight: _Flight, cost: float, func: Callable[[], Any]) -> Any:
+        """Take quota for a call and make it, waiting again on quota errors."""
+        started = time.monotonic()
+        while True:
+            self._acquire(flight, cost, started)
+            try:
+                return func()
+            except Exception as error:
+                if not is_quota_error(error):
+                    raise
+                # The API's own count wins: spend nothing until the bucket refills
+                logger.warning("YouTube API quota exhausted: %s", error)
+                with self._condition:
+                    self._tokens = min(self._tokens, 0.0)
+                    self._stats["quota_errors"] += 1
+
+    def _acquire(self, flight: _Flight, cost: float, started: float) -> None:
+        """Wait in line until the bucket holds enough units, then take them."""
+        wait_start = time.monotonic()
+        with self._condition:
+            self._waiting.append(flight)
+            try:
+                while True:
+                    self._refill()
+                    floor = self.reserve if flight.priority == PREFETCH else 0.0
+                    needed = cost + floor - self._tokens
+                    first = min(self._waiting, key=lambda waiting: (waiting.priority, waiting.sequence))
+                    if first is flight and needed <= 0:
+                        self._tokens -= cost
+                        self._stats["calls"] += 1
+                        break
+                    retry_after = max(needed, 0.0) / self.refill_per_second
+                    remaining = started + MAX_QUOTA_WAIT_SECONDS[flight.priority] - time.monotonic()
+                    if retry_after > remaining:
+                        self._stats["rejected"] += 1
+                        raise QuotaExceededError(
+                            f"YouTube API quota is used up; try again in {retry_after / 60:.0f} min",
+                            retry_after
+                        )
+                    self._condition.wait(retry_after if first is flight else remaining)
+            finally:
+                self._waiting.remove(flight)
+                self._condition.notify_all()
+        waited = time.monotonic() - wait_start
+        if waited > 0.001:
+            with self._condition:
+                self._stats["waited"] += 1
+            record_span("youtube.quota_wait", waited, cost=cost, priority=flight.priority)
+
+    def _refill(self) -> None:
+        """Add the units earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.refill_per_second)
+        self._refilled_at = now
+
+_quota_scheduler: Optional[QuotaScheduler] = None
+_quota_scheduler_lock = threading.Lock()
+
+def get_quota_scheduler() -> QuotaScheduler:
+    """Return the process-wide quota scheduler, creating it on first use."""
+    global _quota_scheduler
+    if _quota_scheduler is None:
+        with _quota_scheduler_lock:
+            if _quota_scheduler is None:
+                units = float(os.environ.get("MAGICLINK_YOUTUBE_QUOTA", DAILY_QUOTA_UNITS))
+                _quota_scheduler = QuotaScheduler(units)
+    return _quota_scheduler
+
+_client_manager: Optional[YouTubeClientManager] = None
+_client_manager_lock = threading.Lock()
+
+def get_youtube_client_manager() -> YouTubeClientManager:
+    """Return the process-wide YouTube client manager, creating it on first use."""
+    global _client_manager
+    if _client_manager is None:
+        with _client_manager_lock:
+            if _client_manager is None:
+                _client_manager = YouTubeClientManager()
+    return _client_manager
+
+@lru_cache(maxsize=MAX_CACHED_CAPTION_IDS)
+def find_caption_id(video_id: str) -> str:
+    """Find the English caption track of a YouTube video.
+
+    Caption IDs are stable, so lookups are memoized per process; failed
+    lookups are not.
+
+    Args:
+        video_id: YouTube video ID
+
+    Returns:
+        Caption track ID
+
+    Raises:
+        Exception: If no English transcript is available
+    """
+    manager = get_youtube_client_manager()
+
+    def list_captions() -> Dict[str, Any]:
+        with span("youtube.captions_list", video_id=video_id):
+            return manager.execute(manager.get_client().captions().list(
+                part="id,snippet", 
+                videoId=video_id
+            ))
+
+    captions_response = get_quota_scheduler().run(
+        ("captions.list", video_id), CAPTIONS_LIST_COST, list_captions
+    )
+
+    for item in captions_response.get("items", []):
+        if item["snippet"]["language"] == "en":
+            return item["id"]
+
+    raise Exception("No English transcript available for this video")
+
+def download_caption_text(video_id: str, caption_id: str) -> str:
+    """Download a caption track, serving it from the transcript cache if present.
+
+    Args:
+        video_id: YouTube video ID the track belongs to
+        caption_id: Caption track ID from find_caption_id
+
+    Returns:
+        Caption payload text in SBV format
+    """
+    cache = get_transcript_cache()
+    cached_text = cache.get(video_id, caption_id)
+    if cached_text is not None:
+        return cached_text
+
+    manager = get_youtube_client_manager()
+
+    def download() -> str:
+        with span("youtube.captions_download", video_id=video_id) as attributes:
+            caption_response = manager.execute(manager.get_client().captions().download(
+                id=caption_id
+            ))
+            attributes["bytes"] = len(caption_response)
+        caption_text = caption_response.decode("utf-8")
+        cache.put(video_id, caption_id, caption_text)
+        return caption_text
+
+    # Sessions opening the same video at once share one download
+    return get_quota_scheduler().run(
+        ("captions.download", caption_id), CAPTIONS_DOWNLOAD_COST, download
+    )
+
+def get_caption_text(video_id: str) -> str:
+    """Fetch the raw English caption payload for a YouTube video.
+
+    Args:
+        video_id: YouTube video ID to fetch captions for
+
+    Returns:
+        Caption payload text in SBV format
+
+    Raises:
+        Exception: If no English transcript is available
+    """
+    # Serve warm reruns without touching the YouTube API
+    cached_text = get_transcript_cache().get(video_id)
+    if cached_text is not None:
+        return cached_text
+
+    return download_caption_text(video_id, find_caption_id(video_id))
+
+def get_transcript_segments(video_id: str) -> List[CaptionSegment]:
+    """Fetch the transcript for a YouTube video as structured segments.
+
+    Args:
+        video_id: YouTube video ID to fetch transcript for
+
+    Returns:
+        List of caption segments with start/end times in milliseconds
+    """
+    caption_text = get_caption_text(video_id)
+    with span("captions.parse", chars=len(caption_text)):
+        return parse_captions(caption_text)
+
 def get_transcript(video_id: str) -> List[str]:
     """Fetch and parse the transcript for a YouTube video.
 
@@ -61,41 +505,87 @@ def get_transcript(video_id: str) -> List[str]:
     Raises:
         Exception: If no English transcript is available
     """
-    # Initialize YouTube API client
-    API_SERVICE_NAME = "youtube"
-    API_VERSION = "v3"
-    AUTH_FILE = "my2credentials.json"
-
-    credentials = get_google_creds(AUTH_FILE)
-    youtube_client = googleapiclient.discovery.build(
-        API_SERVICE_NAME, 
-        API_VERSION, 
-        credentials=credentials
-    )
+    return parse_transcript_text(get_caption_text(video_id))
 
-    # Get available captions
-    captions_response = youtube_client.captions().list(
-        part="id,snippet", 
-        videoId=video_id
-    ).execute()
+def is_retryable_error(error: Exception) -> bool:
+    """Check whether a failed YouTube API call is worth retrying.
 
-    # Find English caption ID
-    caption_id = None
-    for item in captions_response.get("items", []):
-        if item["snippet"]["language"] == "en":
-            caption_id = item["id"]
-            break
+    Args:
+        error: Exception raised by the API call
+
+    Returns:
+        True for rate limiting, server errors and dropped connections
+    """
+    from googleapiclient.errors import HttpError
 
-    if not caption_id:
-        raise Exception("No English transcript available for this video")
+    if isinstance(error, HttpError):
+        if error.resp.status in RETRYABLE_STATUS_CODES:
+            return True
+        return bool(_error_reasons(error) & RATE_LIMIT_REASONS)
+    return isinstance(error, (ConnectionError, TimeoutError))
 
-    # Download and parse transcript
-    caption_response = youtube_client.captions().download(
-        id=caption_id
-    ).execute()
-    caption_text = caption_response.decode("utf-8")
-    
-    return parse_transcript_text(caption_text)
+def is_quota_error(error: Exception) -> bool:
+    """Check whether a failed YouTube API call ran out of daily quota."""
+    from googleapiclient.errors import HttpError
+
+    return isinstance(error, HttpError) and bool(_error_reasons(error) & QUOTA_ERROR_REASONS)
+
+def _error_reasons(error: Any) -> set:
+    """Collect the 'reason' fields of an HttpError's details."""
+    details = error.error_details if isinstance(error.error_details, list) else []
+    return {detail.get("reason") for detail in details if isinstance(detail, dict)}
+
+def get_transcript_with_retry(video_id: str, max_retries: int = MAX_FETCH_RETRIES) -> List[str]:
+    """Fetch a transcript, backing off exponentially on retryable errors.
+
+    Args:
+        video_id: YouTube video ID to fetch transcript for
+        max_retries: Number of retries after the first attempt
+
+    Returns:
+        List of transcript segments with timestamps
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return get_transcript(video_id)
+        except Exception as error:
+            if attempt == max_retries or not is_retryable_error(error):
+                raise
+            # Full jitter keeps parallel workers from retrying in lockstep
+            delay = RETRY_BASE_DELAY_SECONDS * (2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+
+def fetch_transcripts(video_ids: Iterable[str],
+                      max_workers: int = MAX_FETCH_WORKERS) -> Iterator[TranscriptResult]:
+    """Fetch transcripts for many videos in parallel.
+
+    Duplicate video IDs are fetched once. Results are yielded as soon as each
+    fetch finishes, so callers can render progress while the rest download.
+    A failure for one video is reported in its result instead of aborting
+    the batch.
+
+    Args:
+        video_ids: YouTube video IDs to fetch
+        max_workers: Maximum number of concurrent fetches
+
+    Returns:
+        Iterator of TranscriptResult in completion order
+    """
+    unique_ids = list(dict.fromkeys(video_ids))
+    if not unique_ids:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_ids))) as pool:
+        futures = {
+            pool.submit(bind(get_transcript_with_retry), video_id): video_id
+            for video_id in unique_ids
+        }
+        for future in as_completed(futures):
+            video_id = futures[future]
+            try:
+                yield TranscriptResult(video_id, future.result(), None)
+            except Exception as error:
+                yield TranscriptResult(video_id, None, error)
 
 def convert_time_to_ms(time_str: str) -> int:
     """Convert timestamp string to milliseconds.
@@ -115,39 +605,14 @@ def convert_time_to_ms(time_str: str) -> int:
     )
     return total_ms
 
+@traced("captions.parse")
 def parse_transcript_text(caption_data: str) -> List[str]:
     """Parse YouTube caption data into transcript segments.
 
     Args:
-        caption_data: Raw caption data from YouTube API
+        caption_data: Raw caption data from YouTube API (SBV, SRT or WebVTT)
 
     Returns:
         List of transcript segments with timestamps at regular intervals
     """
-    transcript_segments = []
-    MIN_GAP_MS = 30 * 1000  # 30 seconds in milliseconds
-    last_timestamp_ms = -2 * MIN_GAP_MS
-    
-    # Process caption blocks
-    for block in caption_data.strip().split("\n\n"):
-        lines = block.split("\n")
-        if len(lines) >= 2:
-            text = lines[1]
-            if text == "e":  # Skip empty segments
-                continue
-            
-            # Parse timing information
-            timing = lines[0]
-            start_time, end_time = timing.split(",")
-            current_time_ms = convert_time_to_ms(start_time)
-            
-            # Add timestamp if enough time has passed
-            if current_time_ms - last_timestamp_ms > MIN_GAP_MS:
-                transcript_segments.append(f"<Timestamp: {start_time}>")
-                last_timestamp_ms = current_time_ms
-                
-            transcript_segments.append(text)
-
-    # Add final timestamp
-    transcript_segments.append(f"<Timestamp: {end_time}>")
-    return transcript_segments
\ No newline at end of file
+    return format_transcript(parse_captions(caption_data))
@@ -5,18 +5,32 @@ using magic links. It fetches session data, extracts video transcripts, and
 provides an interactive chat interface for analysis.
 """
 
+import asyncio
+import time
 import streamlit as st
-import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
-from datetime import datetime
-from typing import Dict, List, Tuple, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from core_chat import chat_with_transcript_history
-from google_integration import get_transcript
+from context_builder import get_transcript_index
+from google_integration import (
+    INTERACTIVE, PREFETCH, QuotaExceededError, download_caption_text, find_caption_id,
+    get_caption_text, parse_transcript_text, run_with_priority
+)
+from page_cache import memoize_page_load
+from prefetch import PREFETCH_RECENT_VIDEOS, get_prefetcher
+from session_api import get_session_api
+from session_index import SessionIndex
+from token_accounting import get_encoding
+from tracing import bind, start_trace
+from transcript_cache import get_transcript_cache
+from transcript_view import render_paginated, render_transcript_view
 
-# API endpoint for fetching student session information
-API_BASE_URL = "https://apigateway.navigator.pyxeda.ai/aiclub/one-on-one-student-info"
+# Worker threads for the blocking stages of the magic link pipeline. A private
+# pool lets the event loop finish without waiting for background caption
+# listings, whose results are memoized for later pages.
+PIPELINE_WORKERS = 8
+_pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="magiclink")
 
 def validate_magic_link(magic_link: str) -> str:
     """Validate and return the magic link.
@@ -29,20 +43,16 @@ def validate_magic_link(magic_link: str) -> str:
     """
     return magic_link
 
-def get_latest_session_info(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+def get_latest_session_info(index: SessionIndex) -> Dict[str, Any]:
     """Get information about the most recent session.
 
     Args:
-        sessions: List of session data dictionaries
+        index: Index over the student's sessions
 
     Returns:
         Dictionary containing latest session information
     """
-    # Find the most recent session by date
-    latest_session = max(
-        sessions,
-        key=lambda s: datetime.fromisoformat(s["session_date"].replace("Z", "+00:00"))
-    )
+    latest_session = index.latest
     
     # Extract relevant session information
     session_info = {
@@ -54,22 +64,24 @@ def get_latest_session_info(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
         "time_zone": latest_session.get("time_zone", "")
     }
     
-    print(f"Latest session info: {session_info}")
     return session_info
 
-def extract_session_data(response_json: Dict[str, Any]) -> Tuple[List[Dict[str, str]], str]:
+def extract_session_data(response_json: Dict[str, Any],
+                         index: Optional[SessionIndex] = None) -> Tuple[List[Dict[str, str]], str]:
     """Extract session data and video URL from API response.
 
     Args:
         response_json: JSON response from the API
+        index: Prebuilt index over the response's sessions, if available
 
     Returns:
         Tuple containing:
-            - List of session summaries with dates
+            - List of session summaries with dates, oldest first
             - URL of the first video from the latest session
     """
-    sessions = response_json['data']['sessions']
-    latest_session = get_latest_session_info(sessions)
+    if index is None:
+        index = SessionIndex.from_payload(response_json)
+    latest_session = get_latest_session_info(index)
     
     # Get video URL from latest session
     video_url = latest_session['youtube_link']
@@ -82,7 +94,7 @@ def extract_session_data(response_json: Dict[str, Any]) -> Tuple[List[Dict[str,
             "date": session['session_date'],
             "summary": str(session['session_summary'])
         }
-        for session in sessions
+        for session in index.sessions
     ]
     
     return session_summaries, video_url
@@ -109,32 +121,149 @@ def extract_video_id(url: str) -> str:
     
     return video_id
 
+def session_video_ids(index: SessionIndex) -> List[str]:
+    """List the YouTube video IDs of all sessions, newest session first.
+
+    Args:
+        index: Index over the student's sessions
+
+    Returns:
+        Unique video IDs
+    """
+    video_ids = []
+    for session in index.newest_first():
+        links = session.get("youtube_link") or []
+        if isinstance(links, str):
+            links = [links]
+        video_ids.extend(extract_video_id(link) for link in links)
+    return list(dict.fromkeys(video_ids))
+
+async def _run_stage(timings: Dict[str, float], stage: str,
+                     func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking stage on the pipeline pool and record its duration."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_pipeline_executor, bind(func), *args)
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+def _consume_exception(task: "asyncio.Future[Any]") -> None:
+    """Mark a background task's exception as handled."""
+    if not task.cancelled():
+        task.exception()
+
+async def load_magic_link(link_id: str,
+                          timings: Dict[str, float]) -> Tuple[List[Dict[str, str]], str, List[str]]:
+    """Load session data and the latest transcript with overlapping stages.
+
+    The tokenizer warms up while the session API is queried. Once the
+    session JSON arrives, captions are listed at once for the latest video
+    and the few most recent others that aren't cached yet. The latest
+    video's transcript downloads as soon as its own listing finishes, and
+    the session history is rendered in the meantime.
+
+    Args:
+        link_id: The magic link identifier
+        timings: Dictionary that receives the duration of each stage in seconds
+
+    Returns:
+        Tuple containing:
+            - List of session summaries with dates
+            - Video ID of the latest session's first video
+            - Transcript segments of that video
+    """
+    start = time.perf_counter()
+    warm_up = asyncio.ensure_future(_run_stage(timings, "tokenizer_warm_up", get_encoding))
+
+    session_api = get_session_api()
+    session_data = await _run_stage(timings, "session_api", session_api.fetch, link_id)
+    index = session_api.fetch_index(link_id)
+    session_summaries, video_url = extract_session_data(session_data, index)
+    latest_video_id = extract_video_id(video_url)
+
+    # Each listing costs quota, so only the most recent videos are listed here;
+    # only the latest video's listing is urgent enough to spend interactive quota
+    recent_video_ids = [
+        video_id for video_id in session_video_ids(index) if video_id != latest_video_id
+    ][:PREFETCH_RECENT_VIDEOS]
+    cache = get_transcript_cache()
+    listings = {}
+    for video_id in [latest_video_id] + recent_video_ids:
+        if not cache.contains(video_id):
+            priority = INTERACTIVE if video_id == latest_video_id else PREFETCH
+            listing = asyncio.ensure_future(_run_stage(
+                timings, f"caption_list:{video_id}", run_with_priority, priority, find_caption_id, video_id
+            ))
+            listing.add_done_callback(_consume_exception)
+            listings[video_id] = listing
+
+    async def fetch_latest_transcript() -> List[str]:
+        if latest_video_id in listings:
+            caption_id = await listings[latest_video_id]
+            caption_text = await _run_stage(
+                timings, "caption_download", download_caption_text, latest_video_id, caption_id
+            )
+        else:
+            caption_text = await _run_stage(timings, "caption_cache", get_caption_text, latest_video_id)
+        return await _run_stage(timings, "caption_parse", parse_transcript_text, caption_text)
+
+    transcript_task = asyncio.ensure_future(fetch_latest_transcript())
+
+    # Warm the next most recent sessions in the background
+    get_prefetcher().enqueue_videos(recent_video_ids)
+
+    # Render the session history while the transcript is still downloading
+    with st.sidebar.expander("Session History"):
+        render_paginated(session_summaries, key="ml_session_history", hide_index=False)
+
+    video_transcript = await transcript_task
+    await _run_stage(timings, "context_index", get_transcript_index, "\n".join(video_transcript))
+    await warm_up
+    timings["total"] = time.perf_counter() - start
+    return session_summaries, latest_video_id, video_transcript
+
+@start_trace("magic_link", state=st.session_state)
 def process_magic_link(link_id: str) -> None:
     """Process a magic link to display session data and chat interface.
 
     Args:
         link_id: The magic link identifier
     """
-    # Fetch session data from API
-    api_url = f"{API_BASE_URL}?linkId={link_id}"
-    response = requests.get(api_url)
-    session_data = json.loads(response.text)
+    # Fetch session data and transcript with overlapping stages, once per
+    # link; chat turns rerun only the chat fragment and skip this entirely
+    def load() -> Tuple[List[Dict[str, str]], str, str, Dict[str, float]]:
+        timings: Dict[str, float] = {}
+        session_summaries, video_id, video_transcript = asyncio.run(load_magic_link(link_id, timings))
+        return session_summaries, video_id, "\n".join(video_transcript), timings
     
-    # Extract session information and video transcript
-    session_summaries, video_url = extract_session_data(session_data)
-    video_id = extract_video_id(video_url)
-    video_transcript = get_transcript(video_id)
+    try:
+        loaded, reused = memoize_page_load(st.session_state, "magic_link", link_id, load)
+    except QuotaExceededError as error:
+        # Fetch the transcript in the background once quota is available again
+        get_prefetcher().enqueue_link(link_id, recent_videos=1)
+        st.warning(f"{error}. The latest session is queued and will be ready then.")
+        return
+    session_summaries, video_id, transcript_text, timings = loaded
+    if reused:
+        with st.sidebar.expander("Session History"):
+            render_paginated(session_summaries, key="ml_session_history", hide_index=False)
     
-    # Display session data in sidebar
-    with st.sidebar.expander("Session History"):
-        st.dataframe(session_summaries, hide_index=False)
+    # Display transcript and stage timings in sidebar
     with st.sidebar.expander("Video Transcript"):
-        st.dataframe(video_transcript)
+        render_transcript_view(video_id, key="ml_transcript")
+    with st.sidebar.expander("Load Timings"):
+        st.dataframe(
+            [{"stage": stage, "seconds": round(seconds, 3)} for stage, seconds in timings.items()],
+            hide_index=True
+        )
     
     # Initialize chat interface
+    from core_chat import chat_with_transcript_history
     chat_with_transcript_history(
-        str(video_transcript),
-        str(session_summaries)
+        transcript_text,
+        str(session_summaries),
+        transcripts={video_id: transcript_text}
     )
 
 def main() -> None:
@@ -0,0 +1,187 @@
+"""Map-reduce question answering over several transcripts.
+
+This module splits each video's transcript into parts that fit a token
+budget and asks the question of every part concurrently (map). It then
+combines the partial answers in one streamed call (reduce), so answer
+latency tracks the slowest part instead of the total transcript length.
+"""
+
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from context_builder import get_transcript_index
+from token_accounting import usage_from_metadata
+from tracing import record_span, span
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+# Map-reduce settings
+MAP_PART_TOKENS = 24000
+MAX_MAP_CONCURRENCY = 8
+# Answer the map step gives when a part says nothing about the question
+NOT_FOUND = "NOT_FOUND"
+
+MAP_PROMPT = f"""
+You are helping a session analysis coach. Below is one part of the transcript
+of one tutoring session. Answer the user's question using only this part.
+Quote timestamps where relevant. If this part contains nothing relevant to
+the question, reply with exactly {NOT_FOUND}.
+"""
+
+REDUCE_PROMPT = """
+You are a helpful and thoughtful session analysis coach who double-checks their work.
+You are given notes that other assistants wrote while reading different parts
+of the student's session transcripts, each labelled with its video and part.
+Combine them into one answer to the user's question. Resolve overlaps, keep
+timestamps, and say so if the notes do not answer the question.
+"""
+
+class TranscriptPart(NamedTuple):
+    """A slice of one video's transcript that fits the map budget."""
+    label: str
+    text: str
+    tokens: int
+
+def split_transcripts(transcripts: Dict[str, str],
+                      part_tokens: int = MAP_PART_TOKENS) -> List[TranscriptPart]:
+    """Split transcripts into parts of at most ``part_tokens`` tokens.
+
+    Parts break at timestamp markers, reusing the cached retrieval index of
+    each transcript for the chunk token counts.
+
+    Args:
+        transcripts: Transcript text by video ID
+        part_tokens: Token budget of one part
+
+    Returns:
+        Parts in video and transcript order
+    """
+    parts = []
+    for video_id, transcript in transcripts.items():
+        index = get_transcript_index(transcript)
+        pieces: List[str] = []
+        used = 0
+        number = 1
+
+        def flush() -> None:
+            nonlocal pieces, used, number
+            if pieces:
+                parts.append(TranscriptPart(f"video {video_id}, part {number}", "\n".join(pieces), used))
+                pieces, used, number = [], 0, number + 1
+
+        for chunk in index.chunks:
+            if used and used + chunk.tokens > part_tokens:
+                flush()
+            if chunk.timestamp:
+                pieces.append(f"<Timestamp: {chunk.timestamp}>")
+            pieces.append(chunk.text)
+            used += chunk.tokens
+        flush()
+    return parts
+
+def _conversation(chat_messages: List[Dict[str, str]]) -> List[BaseMessage]:
+    """Convert earlier chat turns into LangChain messages."""
+    messages: List[BaseMessage] = []
+    for message in chat_messages:
+        if message["role"] == "user":
+            messages.append(HumanMessage(content=message["content"]))
+        elif message["role"] == "assistant":
+            messages.append(AIMessage(content=message["content"]))
+    return messages
+
+def map_answers(model: "ChatOpenAI", question: str, parts: List[TranscriptPart],
+                max_concurrency: int = MAX_MAP_CONCURRENCY,
+                usage: Optional[Dict[str, int]] = None) -> List[str]:
+    """Ask the question of every part concurrently.
+
+    Args:
+        model: Chat model to query
+        question: The user's question
+        parts: Transcript parts from split_transcripts
+        max_concurrency: Maximum number of parts queried at once
+        usage: Optional dictionary that accumulates prompt_tokens and
+            completion_tokens across the calls
+
+    Returns:
+        One labelled partial answer per part that had something relevant;
+        failed parts are reported in place of their answer
+    """
+    requests = [
+        [
+            SystemMessage(content=MAP_PROMPT),
+            SystemMessage(content=f"Transcript ({part.label}): {part.text}"),
+            HumanMessage(content=question)
+        ]
+        for part in parts
+    ]
+    with span("llm.map", parts=len(parts)):
+        responses = model.batch(
+            requests, config={"max_concurrency": max_concurrency}, return_exceptions=True
+        )
+
+    notes = []
+    for part, response in zip(parts, responses):
+        if isinstance(response, Exception):
+            notes.append(f"[{part.label}] (could not be read: {type(response).__name__})")
+            continue
+        if usage is not None:
+            for key, value in (usage_from_metadata(response.usage_metadata) or {}).items():
+                usage[key] = usage.get(key, 0) + value
+        answer = str(response.content).strip()
+        if answer and NOT_FOUND not in answer:
+            notes.append(f"[{part.label}]\n{answer}")
+    return notes
+
+def stream_map_reduce(model: "ChatOpenAI", question: str, parts: List[TranscriptPart],
+                      history: str, chat_messages: List[Dict[str, str]],
+                      latency: Dict[str, Any],
+                      usage: Optional[Dict[str, int]] = None,
+                      max_concurrency: int = MAX_MAP_CONCURRENCY) -> Iterator[str]:
+    """Answer a question over many parts, streaming the combined answer.
+
+    Args:
+        model: Chat model to query
+        question: The user's question
+        parts: Transcript parts from split_transcripts
+        history: Previous session history
+        chat_messages: Earlier chat turns, excluding the question
+        latency: Dictionary that receives 'map', 'time_to_first_token' and
+            'total' in seconds once the stream is consumed
+        usage: Optional dictionary that accumulates token usage
+        max_concurrency: Maximum number of parts queried at once
+
+    Yields:
+        Text fragments of the combined answer as they arrive
+    """
+    start = time.perf_counter()
+    notes = map_answers(model, question, parts, max_concurrency, usage)
+    latency["map"] = time.perf_counter() - start
+
+    messages: List[BaseMessage] = [SystemMessage(content=REDUCE_PROMPT)]
+    if len(history) > 1:
+        messages.append(SystemMessage(content=f"History: {history}"))
+    messages.append(SystemMessage(
+        content="Notes:\n\n" + ("\n\n".join(notes) if notes else "(no part of the transcripts was relevant)")
+    ))
+    messages.extend(_conversation(chat_messages))
+    messages.append(HumanMessage(content=question))
+
+    reduce_start = time.perf_counter()
+    reduce_usage: Dict[str, int] = {}
+    for chunk in model.stream(messages):
+        if chunk.usage_metadata:
+            reduce_usage = usage_from_metadata(chunk.usage_metadata) or reduce_usage
+        if not chunk.content:
+            continue
+        if "time_to_first_token" not in latency:
+            latency["time_to_first_token"] = time.perf_counter() - start
+        yield chunk.content
+    latency["total"] = time.perf_counter() - start
+    latency.setdefault("time_to_first_token", latency["total"])
+    record_span("llm.reduce", time.perf_counter() - reduce_start, notes=len(notes))
+    if usage is not None:
+        for key, value in reduce_usage.items():
+            usage[key] = usage.get(key, 0) + value
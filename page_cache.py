@@ -0,0 +1,41 @@
+"""Per-session memoization of page data loaders.
+
+Chat turns rerun only the chat fragment, but other widgets (and page
+switches) still rerun the whole page script. The loaders memoized here keep
+the last result of each page in session state, so those reruns reuse the
+loaded sessions and transcript instead of repeating the pipeline.
+"""
+
+import time
+from typing import Any, Callable, MutableMapping, Tuple
+
+# Seconds a page load is reused; matches the session API response cache
+PAGE_LOAD_TTL_SECONDS = 60
+
+def memoize_page_load(state: MutableMapping[str, Any], name: str, key: str,
+                      loader: Callable[[], Any],
+                      max_age: float = PAGE_LOAD_TTL_SECONDS) -> Tuple[Any, bool]:
+    """Return a page's loaded data, running the loader only when needed.
+
+    Only the latest key is kept per page, so switching magic links replaces
+    the memoized data instead of accumulating it. Loader exceptions
+    propagate and are not memoized.
+
+    Args:
+        state: Session state mapping, such as st.session_state
+        name: Name of the page or loader
+        key: What the data was loaded for, such as the magic link ID
+        loader: Function that loads the data
+        max_age: Seconds after which the data is loaded again
+
+    Returns:
+        Tuple of the data and whether it was reused from an earlier run
+    """
+    loads = state.setdefault("page_loads", {})
+    entry = loads.get(name)
+    now = time.time()
+    if entry is not None and entry[0] == key and now - entry[1] < max_age:
+        return entry[2], True
+    value = loader()
+    loads[name] = (key, now, value)
+    return value, False
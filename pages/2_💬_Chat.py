@@ -1,14 +1,20 @@
 import streamlit as st
 from core_chat import chat_with_transcript_history
+from transcript_store import get_transcript_store
 
 st.title("Chat Interface")
 
 if 'videos' not in st.session_state or not st.session_state['videos']:
     st.warning("No videos processed yet. Please analyze a video first.")
 else:
-    # Combine all transcripts
-    transcript_combined = ""
-    for video_id in st.session_state['videos']:
-        transcript_combined += st.session_state[str(video_id)]
+    # Combine all transcripts (memoized in the shared store)
+    store = get_transcript_store()
+    transcript_combined = store.combined(st.session_state['videos'])
     
-    chat_with_transcript_history(transcript_combined, "")
+    # Individual transcripts for the map-reduce answer mode
+    transcripts = {
+        video_id: store.get(video_id) for video_id in st.session_state['videos']
+        if video_id in store
+    }
+    
+    chat_with_transcript_history(transcript_combined, "", transcripts=transcripts)
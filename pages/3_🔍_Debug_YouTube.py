@@ -1,18 +1,41 @@
 import streamlit as st
+from cache_backend import get_cache_backend
+from google_integration import get_quota_scheduler
+from transcript_cache import get_transcript_cache
+from transcript_store import get_transcript_store
+from transcript_view import render_transcript_view
 
 st.title("Debug: YouTube")
 
+# Transcript cache counters
+with st.expander("Transcript cache"):
+    st.json(get_transcript_cache().stats())
+
+# Transcripts held in this process for the sessions' pages
+with st.expander("Transcript store"):
+    st.json(get_transcript_store().stats())
+
+# Counters of the cache shared with other processes and replicas
+with st.expander("Shared cache backend"):
+    st.json(get_cache_backend().stats())
+
+# YouTube Data API quota and request coalescing counters
+with st.expander("YouTube quota"):
+    st.json(get_quota_scheduler().stats())
+
 if 'videos' not in st.session_state:
     st.warning("No videos in session state")
 else:
-    # Display all transcripts
-    transcripts = []
-    for video_id in st.session_state['videos']:
-        transcript = st.session_state[str(video_id)]
-        transcripts.append({
-            'ID': video_id,
-            'Transcript': transcript,
-            'Preview': transcript[:500]
-        })
+    # Display a summary of each stored transcript
+    store = get_transcript_store()
+    transcripts = [
+        info for info in (store.info(video_id) for video_id in st.session_state['videos'])
+        if info is not None
+    ]
     
     st.dataframe(transcripts)
+    
+    # Browse one transcript at a time
+    video_id = st.selectbox("Transcript", st.session_state['videos'])
+    if video_id:
+        render_transcript_view(video_id, key="debug_yt_transcript")
@@ -0,0 +1,47 @@
+import streamlit as st
+from tracing import get_metrics
+
+st.title("Debug: Timings")
+
+traces = st.session_state.get('traces', [])
+if not traces:
+    st.write("No requests traced yet. Open a magic link or YouTube URL first.")
+else:
+    # Most recent request first
+    labels = [
+        f"{trace.name} {trace.trace_id} ({(trace.duration or 0) * 1000:.0f} ms)"
+        for trace in reversed(traces)
+    ]
+    selected = st.selectbox("Request", range(len(labels)), format_func=labels.__getitem__)
+    trace = traces[-1 - selected]
+    
+    rows = trace.breakdown()
+    st.dataframe(rows, hide_index=True)
+    
+    # Total time per span name, slowest first
+    totals = {}
+    for record in trace.spans:
+        totals[record.name] = totals.get(record.name, 0.0) + record.duration * 1000
+    st.bar_chart({"ms": totals})
+
+# Chat turns rerun only the chat fragment; show what each cost besides the model
+turns = [trace for trace in traces if trace.name == "chat_turn" and trace.duration]
+if turns:
+    with st.expander("Chat turns"):
+        rows = []
+        for trace in reversed(turns):
+            model_ms = sum(
+                record.duration for record in trace.spans if record.name.startswith("llm.")
+            ) * 1000
+            rows.append({
+                "trace": trace.trace_id,
+                "total_ms": round(trace.duration * 1000, 1),
+                "model_ms": round(model_ms, 1),
+                "overhead_ms": round(trace.duration * 1000 - model_ms, 1)
+            })
+        st.dataframe(rows, hide_index=True)
+
+with st.expander("Process metrics"):
+    metrics = get_metrics()
+    st.dataframe(metrics.summary(), hide_index=True)
+    st.code(metrics.render_openmetrics(), language="text")
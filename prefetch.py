@@ -0,0 +1,213 @@
+"""Background prefetch of transcripts and retrieval indexes.
+
+This module runs a small pool of daemon workers that download transcripts
+into the transcript cache and pre-build the per-transcript indexes used by
+the chat, search and transcript views. Sessions a coach is likely to open next are
+then ready before the page asks for them.
+
+Links can be queued from the app (the most recent sessions of the link being
+viewed), from a links file named by ``MAGICLINK_PREFETCH_LINKS`` when the
+app starts, or from the command line for a nightly warm-up of the on-disk
+transcript cache:
+
+    python prefetch.py links.txt --recent 5
+"""
+
+import argparse
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from google_integration import (
+    PREFETCH, QuotaExceededError, get_transcript_with_retry, request_priority
+)
+from search_index import get_search_index_store
+from session_api import SessionAPIError, get_session_api
+from token_accounting import count_tokens
+from tracing import span
+from transcript_view import get_segment_index
+
+# Prefetch settings
+PREFETCH_WORKERS = 2
+PREFETCH_RECENT_VIDEOS = 3
+LINKS_FILE_ENV = "MAGICLINK_PREFETCH_LINKS"
+
+logger = logging.getLogger(__name__)
+
+class TranscriptPrefetcher:
+    """Queue of links and videos warmed by background worker threads.
+
+    Each video is queued at most once while it is pending. Work items are
+    ("link", link_id) or ("video", video_id); a link expands into its most
+    recent videos once the session API answers.
+    """
+
+    def __init__(self, workers: int = PREFETCH_WORKERS,
+                 recent_videos: int = PREFETCH_RECENT_VIDEOS):
+        """Create a prefetcher; worker threads start with the first item.
+
+        Args:
+            workers: Number of worker threads
+            recent_videos: Videos prefetched per link, newest first
+        """
+        self.workers = workers
+        self.recent_videos = recent_videos
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        self._threads: List[threading.Thread] = []
+        self._stats = {"links": 0, "videos": 0, "failed": 0, "deferred": 0}
+
+    def enqueue_link(self, link_id: str, recent_videos: Optional[int] = None) -> None:
+        """Queue the most recent videos of a magic link for prefetching.
+
+        Args:
+            link_id: The magic link identifier
+            recent_videos: Videos to prefetch, newest first; defaults to
+                the prefetcher's setting
+        """
+        self._put(("link", link_id, recent_videos or self.recent_videos))
+
+    def enqueue_videos(self, video_ids: Iterable[str]) -> None:
+        """Queue videos for prefetching, skipping ones already pending."""
+        for video_id in video_ids:
+            self._put(("video", video_id, None))
+
+    def enqueue_links_file(self, path: str, recent_videos: Optional[int] = None) -> int:
+        """Queue every link listed in a file, one per line.
+
+        Blank lines and lines starting with '#' are ignored.
+
+        Args:
+            path: Path of the links file
+            recent_videos: Videos to prefetch per link
+
+        Returns:
+            Number of links queued
+        """
+        links = [
+            line.strip() for line in Path(path).read_text().splitlines()
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+        for link_id in links:
+            self.enqueue_link(link_id, recent_videos)
+        return len(links)
+
+    def join(self) -> None:
+        """Block until every queued item has been processed."""
+        self._queue.join()
+
+    def stats(self) -> Dict[str, int]:
+        """Return counts of processed links, warmed videos, failures and quota deferrals."""
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    def _put(self, item: tuple) -> None:
+        """Queue an item unless it is already pending, starting workers if needed."""
+        key = item[:2]
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if not self._threads:
+                for number in range(self.workers):
+                    thread = threading.Thread(
+                        target=self._work, daemon=True, name=f"prefetch-{number}"
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+        self._queue.put(item)
+
+    def _work(self) -> None:
+        """Worker loop: process items until the process exits."""
+        while True:
+            kind, key, recent_videos = self._queue.get()
+            try:
+                if kind == "link":
+                    self._prefetch_link(key, recent_videos)
+                else:
+                    self._prefetch_video(key)
+            except QuotaExceededError as error:
+                # Try again once the YouTube quota has refilled
+                with self._lock:
+                    self._stats["deferred"] += 1
+                timer = threading.Timer(error.retry_after, self._put, args=((kind, key, recent_videos),))
+                timer.daemon = True
+                timer.start()
+            except Exception as error:
+                with self._lock:
+                    self._stats["failed"] += 1
+                logger.warning("Prefetch of %s %s failed: %s", kind, key, error)
+            finally:
+                with self._lock:
+                    self._pending.discard((kind, key))
+                self._queue.task_done()
+
+    def _prefetch_link(self, link_id: str, recent_videos: int) -> None:
+        """Expand a link into its most recent videos."""
+        # Imported here because magiclink_chat imports this module
+        from magiclink_chat import session_video_ids
+
+        with span("prefetch.link"):
+            try:
+                index = get_session_api().fetch_index(link_id)
+            except SessionAPIError as error:
+                raise RuntimeError(f"session API: {error}") from error
+        self.enqueue_videos(session_video_ids(index)[:recent_videos])
+        with self._lock:
+            self._stats["links"] += 1
+
+    def _prefetch_video(self, video_id: str) -> None:
+        """Download a transcript and build everything derived from it."""
+        # YouTube quota goes to interactive requests first
+        with span("prefetch.video", video_id=video_id), request_priority(PREFETCH):
+            transcript = "\n".join(get_transcript_with_retry(video_id))
+            count_tokens(transcript)
+            get_search_index_store().get(video_id, transcript)
+            get_segment_index(video_id)
+        with self._lock:
+            self._stats["videos"] += 1
+
+_prefetcher: Optional[TranscriptPrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+def get_prefetcher() -> TranscriptPrefetcher:
+    """Return the process-wide prefetcher, creating it on first use.
+
+    On creation, the links file named by MAGICLINK_PREFETCH_LINKS (if any)
+    is queued.
+    """
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                prefetcher = TranscriptPrefetcher()
+                links_file = os.environ.get(LINKS_FILE_ENV)
+                if links_file:
+                    try:
+                        prefetcher.enqueue_links_file(links_file)
+                    except OSError as error:
+                        logger.warning("Could not read prefetch links file %s: %s", links_file, error)
+                _prefetcher = prefetcher
+    return _prefetcher
+
+def main() -> None:
+    """Warm the transcript cache for every link in a file, then exit."""
+    parser = argparse.ArgumentParser(description="Prefetch transcripts for a list of magic links.")
+    parser.add_argument("links_file", help="File with one magic link ID per line")
+    parser.add_argument("--recent", type=int, default=PREFETCH_RECENT_VIDEOS,
+                        help="Videos to prefetch per link, newest first")
+    parser.add_argument("--workers", type=int, default=PREFETCH_WORKERS, help="Worker threads")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    prefetcher = TranscriptPrefetcher(workers=args.workers, recent_videos=args.recent)
+    queued = prefetcher.enqueue_links_file(args.links_file)
+    prefetcher.join()
+    print(f"Prefetched {queued} links: {prefetcher.stats()}")
+
+if __name__ == "__main__":
+    main()
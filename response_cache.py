@@ -0,0 +1,236 @@
+"""Cache of chat answers for repeated coach questions.
+
+This module caches model answers keyed by the transcript, the history the
+question was asked against, and the normalized question text. An optional
+embedding lookup also serves near-duplicate phrasings of a cached question.
+Exact-match answers are also written to the shared cache backend, so a
+question answered by one app process is answered from cache by the others.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from cache_backend import CacheBackend
+
+# Response cache settings
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+ANSWER_NAMESPACE = "answer"
+
+logger = logging.getLogger(__name__)
+
+# Embeds stored questions off the render thread; shared by all caches in the process
+_embedding_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="answer-embed")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question and strip punctuation and extra whitespace.
+
+    Args:
+        question: Question as typed by the user
+
+    Returns:
+        Normalized question text
+    """
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", question.lower())).strip()
+
+def content_hash(*parts: str) -> str:
+    """Hash one or more strings into a short hex digest."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    """Cosine similarity of two vectors."""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class _Entry(NamedTuple):
+    answer: str
+    created_at: float
+    embedding: Optional[Tuple[float, ...]]
+
+class ResponseCache:
+    """TTL/LRU cache of answers with optional near-duplicate matching.
+
+    Exact matches on the normalized question are tried first. If an
+    ``embed`` function is given, a miss falls back to the most similar
+    cached question asked against the same transcript and history. With a
+    ``backend``, exact matches missing from this process are looked up there
+    before the near-duplicate search. Embedding failures are logged and
+    leave the cache serving exact matches only.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 embed: Optional[Callable[[str], List[float]]] = None,
+                 similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 backend: Optional[CacheBackend] = None):
+        """Create an empty cache.
+
+        Args:
+            ttl_seconds: Maximum age of a cached answer
+            max_entries: Number of answers kept
+            embed: Function returning an embedding for a question, or None
+                to match exact (normalized) questions only
+            similarity_threshold: Minimum cosine similarity for a
+                near-duplicate match
+            backend: Cache shared with other processes, or None
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._embed = lru_cache(maxsize=256)(embed) if embed else None
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._by_scope: Dict[str, Set[str]] = {}
+        self._stats = {
+            "exact_hits": 0, "shared_hits": 0, "similar_hits": 0, "misses": 0, "embed_errors": 0
+        }
+
+    @staticmethod
+    def scope(transcript: str, history: str, chat_messages: List[Dict[str, Any]]) -> str:
+        """Build the cache scope for a question.
+
+        Args:
+            transcript: Transcript text the question is asked against
+            history: Session history passed to the model
+            chat_messages: Conversation before the question
+
+        Returns:
+            Digest identifying the transcript and history
+        """
+        conversation = "\n".join(f"{message['role']}:{message['content']}" for message in chat_messages)
+        return content_hash(content_hash(transcript), history, conversation)
+
+    def lookup(self, scope: str, question: str) -> Optional[str]:
+        """Return a cached answer for a question, if there is one.
+
+        Args:
+            scope: Value from ``scope`` for the current transcript and history
+            question: The user's question
+
+        Returns:
+            Cached answer, or None on a miss
+        """
+        normalized = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((scope, normalized))
+            if entry is not None and now - entry.created_at <= self.ttl_seconds:
+                self._entries.move_to_end((scope, normalized))
+                self._stats["exact_hits"] += 1
+                return entry.answer
+            candidates = [
+                (cached_question, self._entries[(scope, cached_question)])
+                for cached_question in self._by_scope.get(scope, ())
+            ]
+
+        if self.backend is not None:
+            shared = self.backend.get_json(ANSWER_NAMESPACE, content_hash(scope, normalized))
+            if shared is not None and now - shared["created_at"] <= self.ttl_seconds:
+                with self._lock:
+                    # No embedding, so it only serves exact matches here too
+                    self._remember(scope, normalized, _Entry(shared["answer"], shared["created_at"], None))
+                    self._stats["shared_hits"] += 1
+                return shared["answer"]
+
+        embedding = self._embedding(normalized) if candidates else None
+        if embedding is not None:
+            best_question, best_score = None, self.similarity_threshold
+            for cached_question, cached in candidates:
+                if cached.embedding is None or now - cached.created_at > self.ttl_seconds:
+                    continue
+                score = _cosine(embedding, cached.embedding)
+                if score >= best_score:
+                    best_question, best_score = cached_question, score
+            if best_question is not None:
+                with self._lock:
+                    entry = self._entries.get((scope, best_question))
+                    if entry is not None:
+                        self._entries.move_to_end((scope, best_question))
+                        self._stats["similar_hits"] += 1
+                        return entry.answer
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def store(self, scope: str, question: str, answer: str) -> None:
+        """Cache an answer.
+
+        The answer serves exact matches right away; its question is embedded
+        in the background for near-duplicate matching.
+
+        Args:
+            scope: Value from ``scope`` for the current transcript and history
+            question: The user's question
+            answer: The model's answer
+        """
+        normalized = normalize_question(question)
+        created_at = time.time()
+        with self._lock:
+            self._remember(scope, normalized, _Entry(answer, created_at, None))
+        if self._embed is not None:
+            _embedding_executor.submit(self._attach_embedding, scope, normalized, created_at)
+        if self.backend is not None:
+            self.backend.set_json(
+                ANSWER_NAMESPACE, content_hash(scope, normalized),
+                {"answer": answer, "created_at": created_at}, self.ttl_seconds
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of cached answers."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+    def _embedding(self, normalized: str) -> Optional[Tuple[float, ...]]:
+        """Embed a normalized question, or return None if that is off or fails."""
+        if self._embed is None:
+            return None
+        try:
+            return tuple(self._embed(normalized))
+        except Exception as error:
+            with self._lock:
+                self._stats["embed_errors"] += 1
+            logger.warning("Question embedding failed, matching exact questions only: %s", error)
+            return None
+
+    def _attach_embedding(self, scope: str, normalized: str, created_at: float) -> None:
+        """Add an embedding to a stored answer, unless it was replaced meanwhile."""
+        embedding = self._embedding(normalized)
+        if embedding is None:
+            return
+        with self._lock:
+            entry = self._entries.get((scope, normalized))
+            if entry is not None and entry.created_at == created_at:
+                self._entries[(scope, normalized)] = entry._replace(embedding=embedding)
+
+    def _remember(self, scope: str, normalized: str, entry: _Entry) -> None:
+        """Insert an answer, evicting least recently used ones."""
+        self._entries[(scope, normalized)] = entry
+        self._entries.move_to_end((scope, normalized))
+        self._by_scope.setdefault(scope, set()).add(normalized)
+        while len(self._entries) > self.max_entries:
+            (old_scope, old_question), _ = self._entries.popitem(last=False)
+            questions = self._by_scope.get(old_scope)
+            if questions is not None:
+                questions.discard(old_question)
+                if not questions:
+                    del self._by_scope[old_scope]
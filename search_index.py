@@ -0,0 +1,229 @@
+"""Persistent, timestamp-aware keyword search over video transcripts.
+
+This module keeps one BM25 index per video (the context builder's
+TranscriptIndex over ``parse_transcript_text`` chunks) in memory and in the
+shared cache backend next to the transcripts, so "where did we discuss X" questions are
+answered from the index with jump-to-time YouTube links instead of a model
+call. Indexes loaded here are also handed to the context builder, so the
+chat does not rebuild them.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from cache_backend import CacheBackend, get_cache_backend
+from context_builder import TranscriptIndex, get_transcript_index, remember_transcript_index
+from tracing import span
+from transcript_cache import DEFAULT_TTL_SECONDS
+
+# Search settings
+DEFAULT_SEARCH_LIMIT = 8
+SNIPPET_CHARS = 200
+MAX_MEMORY_INDEXES = 32
+SEARCH_INDEX_NAMESPACE = "search_index"
+
+SEARCH_COMMAND = "/search"
+# "Where did we discuss X?", "When did they talk about X", ...
+SEARCH_QUESTION_PATTERN = re.compile(
+    r"^\s*(?:where|when)\s+(?:did|do|have)\s+(?:we|they|you|i)\s+"
+    r"(?:discuss(?:ed)?|talk(?:ed)?\s+about|cover(?:ed)?|mention(?:ed)?|go\s+over|went\s+over|explain(?:ed)?)\s+"
+    r"(?P<query>.+?)[\s?.!]*$",
+    re.IGNORECASE
+)
+
+logger = logging.getLogger(__name__)
+
+class SearchHit(NamedTuple):
+    """One matching transcript chunk."""
+    video_id: str
+    timestamp: str
+    seconds: int
+    text: str
+    score: float
+
+    @property
+    def link(self) -> Optional[str]:
+        """YouTube link that starts playback at the chunk, if the video is known."""
+        return f"https://youtu.be/{self.video_id}?t={self.seconds}" if self.video_id else None
+
+def parse_search_query(question: str) -> Optional[str]:
+    """Recognize questions that a keyword search can answer without the model.
+
+    Args:
+        question: The user's chat input
+
+    Returns:
+        The search terms for "/search ..." and "where did we discuss ..."
+        questions, or None for anything else
+    """
+    stripped = question.strip()
+    if stripped.lower().startswith(SEARCH_COMMAND):
+        return stripped[len(SEARCH_COMMAND):].strip() or None
+    match = SEARCH_QUESTION_PATTERN.match(stripped)
+    return match.group("query") if match else None
+
+def timestamp_seconds(timestamp: str) -> int:
+    """Convert an 'H:MM:SS.mmm' transcript timestamp to whole seconds."""
+    seconds = 0
+    for part in timestamp.split(".", 1)[0].split(":"):
+        seconds = seconds * 60 + int(part or 0)
+    return seconds
+
+class SearchIndexStore:
+    """Per-video transcript indexes in an LRU memory tier over the cache backend.
+
+    Each video keeps the index of its latest transcript text; an index built
+    from different text (for example after a caption update) is stored under
+    a new key, so a stale index is never served.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_memory_entries: int = MAX_MEMORY_INDEXES):
+        """Create the store.
+
+        Args:
+            backend: Shared tier behind process memory, or None to keep
+                indexes in this process only
+            ttl_seconds: Maximum age of a persisted index
+            max_memory_entries: Number of indexes kept in process memory
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, TranscriptIndex]]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "shared_hits": 0, "builds": 0}
+
+    def get(self, video_id: str, transcript: str) -> TranscriptIndex:
+        """Return the index of a video's transcript, loading or building it once.
+
+        Args:
+            video_id: YouTube video ID
+            transcript: The video's transcript text from parse_transcript_text
+
+        Returns:
+            Index over the transcript's chunks
+        """
+        digest = hashlib.sha1(transcript.encode("utf-8")).hexdigest()
+        with self._lock:
+            entry = self._memory.get(video_id)
+            if entry is not None and entry[0] == digest:
+                self._memory.move_to_end(video_id)
+                self._stats["memory_hits"] += 1
+                return entry[1]
+
+        index = self._load_shared(video_id, digest)
+        if index is not None:
+            # Serve the chat context builder without rebuilding
+            remember_transcript_index(transcript, index)
+            with self._lock:
+                self._stats["shared_hits"] += 1
+                self._remember(video_id, digest, index)
+            return index
+
+        index = get_transcript_index(transcript)
+        with self._lock:
+            self._stats["builds"] += 1
+            self._remember(video_id, digest, index)
+        if self.backend is not None:
+            with span("search_index.persist", video_id=video_id):
+                self.backend.set_json(
+                    SEARCH_INDEX_NAMESPACE, f"{video_id}:{digest}", index.to_payload(), self.ttl_seconds
+                )
+        return index
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit and build counters and the memory tier size."""
+        with self._lock:
+            return dict(self._stats, memory_entries=len(self._memory))
+
+    def _remember(self, video_id: str, digest: str, index: TranscriptIndex) -> None:
+        """Insert into the memory tier, evicting least recently used entries."""
+        self._memory[video_id] = (digest, index)
+        self._memory.move_to_end(video_id)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load_shared(self, video_id: str, digest: str) -> Optional[TranscriptIndex]:
+        """Read a persisted index built from the same transcript text.
+
+        Entries of the wrong shape are deleted and treated as misses.
+        """
+        if self.backend is None:
+            return None
+        key = f"{video_id}:{digest}"
+        with span("search_index.load", video_id=video_id):
+            payload = self.backend.get_json(SEARCH_INDEX_NAMESPACE, key)
+            if payload is None:
+                return None
+            try:
+                return TranscriptIndex.from_payload(payload)
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                logger.warning("Dropping unreadable shared search index %s: %r", key, error)
+                self.backend.delete(SEARCH_INDEX_NAMESPACE, key)
+                return None
+
+_store: Optional[SearchIndexStore] = None
+_store_lock = threading.Lock()
+
+def get_search_index_store() -> SearchIndexStore:
+    """Return the process-wide search index store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SearchIndexStore(backend=get_cache_backend())
+    return _store
+
+def search_transcripts(transcripts: Dict[str, str], query: str,
+                       limit: int = DEFAULT_SEARCH_LIMIT) -> List[SearchHit]:
+    """Search several videos' transcripts for keywords.
+
+    Args:
+        transcripts: Transcript text by video ID; an empty ID searches
+            without building jump links or persisting the index
+        query: Keywords to look for
+        limit: Maximum number of hits
+
+    Returns:
+        Best matching chunks across all videos, best first
+    """
+    store = get_search_index_store()
+    hits = []
+    with span("search_index.search", videos=len(transcripts)):
+        for video_id, transcript in transcripts.items():
+            index = store.get(video_id, transcript) if video_id else get_transcript_index(transcript)
+            for position, score in index.search(query, limit):
+                chunk = index.chunks[position]
+                hits.append(SearchHit(
+                    video_id, chunk.timestamp, timestamp_seconds(chunk.timestamp) if chunk.timestamp else 0,
+                    chunk.text, score
+                ))
+    hits.sort(key=lambda hit: hit.score, reverse=True)
+    return hits[:limit]
+
+def format_search_results(hits: List[SearchHit], query: str) -> str:
+    """Render search hits as a Markdown list with jump-to-time links.
+
+    Args:
+        hits: Results from search_transcripts
+        query: The search terms, for the heading
+
+    Returns:
+        Markdown text
+    """
+    if not hits:
+        return f"No part of the transcript mentions **{query}**."
+    lines = [f"Found **{query}** at:"]
+    for hit in hits:
+        when = hit.timestamp or "start"
+        label = f"[{when}]({hit.link})" if hit.link else when
+        snippet = hit.text if len(hit.text) <= SNIPPET_CHARS else hit.text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+        lines.append(f"- {label}: {snippet}")
+    return "\n".join(lines)
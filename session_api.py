@@ -0,0 +1,267 @@
+"""Client for the magic-link student session API.
+
+This module provides a shared HTTP client for the one-on-one student info
+endpoint with connection pooling, timeouts, retries with backoff,
+conditional requests and a short-lived response cache keyed by link ID.
+Responses are also written to the shared cache backend, so other app
+processes and replicas can serve or revalidate them without a full download.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache_backend import CacheBackend, get_cache_backend
+from session_index import SessionIndex
+from tracing import span
+
+# API endpoint for fetching student session information
+API_BASE_URL = "https://apigateway.navigator.pyxeda.ai/aiclub/one-on-one-student-info"
+
+# Client settings
+REQUEST_TIMEOUT = (3.05, 20)  # Connect and read timeouts in seconds
+RESPONSE_TTL_SECONDS = 60
+MAX_CACHED_RESPONSES = 256
+# Payloads stay in the shared backend longer than they are served without
+# revalidation, since their validators still turn a refetch into a 304
+SHARED_RESPONSE_TTL_SECONDS = 24 * 3600
+SESSION_NAMESPACE = "session"
+POOL_SIZE = 16
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+logger = logging.getLogger(__name__)
+
+class SessionAPIError(Exception):
+    """Raised when the session API returns an error or unreadable response."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class _CachedResponse:
+    """A cached session payload with its validators."""
+
+    __slots__ = ("payload", "fetched_at", "etag", "last_modified", "index")
+
+    def __init__(self, payload: Dict[str, Any], fetched_at: float,
+                 etag: Optional[str], last_modified: Optional[str]):
+        self.payload = payload
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.index: Optional[SessionIndex] = None
+
+class SessionAPIClient:
+    """Pooled, retrying client for the student session API.
+
+    Responses are cached per link ID for ``ttl_seconds``. After that the
+    cached ETag / Last-Modified validators are sent, so an unchanged payload
+    costs a 304 instead of a full download. A link missing from this
+    process's cache is looked up in the shared backend first.
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL,
+                 ttl_seconds: float = RESPONSE_TTL_SECONDS,
+                 timeout: Tuple[float, float] = REQUEST_TIMEOUT,
+                 max_cached_responses: int = MAX_CACHED_RESPONSES,
+                 backend: Optional[CacheBackend] = None):
+        """Create a client with its own connection pool.
+
+        Args:
+            base_url: Session API endpoint
+            ttl_seconds: How long a response is served without revalidation
+            timeout: Connect and read timeouts in seconds
+            max_cached_responses: Number of link IDs kept in the cache
+            backend: Cache shared with other processes, or None
+        """
+        self.base_url = base_url
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.max_cached_responses = max_cached_responses
+
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        self._http = requests.Session()
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, _CachedResponse]" = OrderedDict()
+        self._stats = {"hits": 0, "shared_hits": 0, "revalidated": 0, "fetched": 0}
+
+    def fetch(self, link_id: str, force: bool = False) -> Dict[str, Any]:
+        """Return the session payload for a magic link.
+
+        Args:
+            link_id: The magic link identifier
+            force: Skip the fresh-cache shortcut and revalidate with the server
+
+        Returns:
+            Parsed JSON payload from the API
+
+        Raises:
+            SessionAPIError: If the request fails or returns a non-200 status
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(link_id)
+            if entry is not None:
+                self._cache.move_to_end(link_id)
+                if not force and now - entry.fetched_at < self.ttl_seconds:
+                    self._stats["hits"] += 1
+                    return entry.payload
+
+        # Another process may have fetched it already
+        if entry is None:
+            entry = self._load_shared(link_id)
+            if entry is not None and not force and now - entry.fetched_at < self.ttl_seconds:
+                with self._lock:
+                    self._stats["shared_hits"] += 1
+                return entry.payload
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            with span("session_api.request", revalidate=entry is not None) as attributes:
+                response = self._http.get(
+                    self.base_url,
+                    params={"linkId": link_id},
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                attributes["status"] = response.status_code
+        except requests.RequestException as error:
+            raise SessionAPIError(f"Session API request failed: {error}") from error
+
+        if response.status_code == 304 and entry is not None:
+            with self._lock:
+                entry.fetched_at = now
+                self._stats["revalidated"] += 1
+            return entry.payload
+
+        if response.status_code != 200:
+            raise SessionAPIError(
+                f"Session API returned {response.status_code}", response.status_code
+            )
+
+        try:
+            payload = response.json()
+        except ValueError as error:
+            raise SessionAPIError("Session API returned invalid JSON", response.status_code) from error
+
+        entry = _CachedResponse(
+            payload, now, response.headers.get("ETag"), response.headers.get("Last-Modified")
+        )
+        with self._lock:
+            self._remember(link_id, entry)
+            self._stats["fetched"] += 1
+        if self.backend is not None:
+            self.backend.set_json(SESSION_NAMESPACE, link_id, {
+                "payload": payload,
+                "fetched_at": now,
+                "etag": entry.etag,
+                "last_modified": entry.last_modified
+            }, SHARED_RESPONSE_TTL_SECONDS)
+        return payload
+
+    def fetch_index(self, link_id: str, force: bool = False) -> SessionIndex:
+        """Return the SessionIndex for a magic link's payload.
+
+        The index is built once per payload and reused for as long as the
+        payload stays cached (including after a 304 revalidation).
+
+        Args:
+            link_id: The magic link identifier
+            force: Revalidate the payload with the server first
+
+        Returns:
+            Index over the link's sessions
+
+        Raises:
+            SessionAPIError: If the request fails or returns a non-200 status
+        """
+        payload = self.fetch(link_id, force)
+        with self._lock:
+            entry = self._cache.get(link_id)
+            if entry is not None and entry.payload is payload:
+                if entry.index is None:
+                    entry.index = SessionIndex.from_payload(payload)
+                return entry.index
+        return SessionIndex.from_payload(payload)
+
+    def invalidate(self, link_id: str) -> None:
+        """Drop the cached payload for a magic link."""
+        with self._lock:
+            self._cache.pop(link_id, None)
+        if self.backend is not None:
+            self.backend.delete(SESSION_NAMESPACE, link_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache hit, revalidation and fetch counters."""
+        with self._lock:
+            return dict(self._stats, cached=len(self._cache))
+
+    def _load_shared(self, link_id: str) -> Optional[_CachedResponse]:
+        """Copy a response cached by another process into this one.
+
+        Entries of the wrong shape are deleted and treated as misses.
+        """
+        if self.backend is None:
+            return None
+        cached = self.backend.get_json(SESSION_NAMESPACE, link_id)
+        if cached is None:
+            return None
+        try:
+            if not isinstance(cached["payload"], dict):
+                raise TypeError("payload is not an object")
+            entry = _CachedResponse(
+                cached["payload"], float(cached["fetched_at"]),
+                cached.get("etag"), cached.get("last_modified")
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as error:
+            logger.warning("Dropping unreadable shared session response for %s: %r", link_id, error)
+            self.backend.delete(SESSION_NAMESPACE, link_id)
+            return None
+        with self._lock:
+            self._remember(link_id, entry)
+        return entry
+
+    def _remember(self, link_id: str, entry: _CachedResponse) -> None:
+        """Cache a response, evicting least recently used links."""
+        self._cache[link_id] = entry
+        self._cache.move_to_end(link_id)
+        while len(self._cache) > self.max_cached_responses:
+            self._cache.popitem(last=False)
+
+_client: Optional[SessionAPIClient] = None
+_client_lock = threading.Lock()
+
+def get_session_api() -> SessionAPIClient:
+    """Return the process-wide session API client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SessionAPIClient(backend=get_cache_backend())
+    return _client
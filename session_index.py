@@ -0,0 +1,119 @@
+"""Indexed view over the sessions in a magic-link API payload.
+
+This module parses session dates once, keeps sessions sorted by date and
+indexes them by session ID, instructor and project, so lookups such as
+"latest session" or "sessions in March" don't rescan the payload.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Sort key for sessions whose date is missing or malformed
+UNKNOWN_DATE = datetime.min.replace(tzinfo=timezone.utc)
+
+def parse_session_date(value: Optional[str]) -> datetime:
+    """Parse an ISO-8601 session date into an aware UTC datetime.
+
+    Args:
+        value: Date string such as '2024-03-01T17:00:00Z'
+
+    Returns:
+        Parsed datetime, or UNKNOWN_DATE if the value cannot be parsed
+    """
+    if not value:
+        return UNKNOWN_DATE
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return UNKNOWN_DATE
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+class SessionIndex:
+    """Sessions sorted by date with lookups by ID, instructor and project."""
+
+    def __init__(self, sessions: List[Dict[str, Any]]):
+        """Build the index.
+
+        Args:
+            sessions: Session dictionaries from the API, in any order
+        """
+        dated = sorted(
+            ((parse_session_date(session.get("session_date")), session) for session in sessions),
+            key=lambda item: item[0]
+        )
+        self.dates: List[datetime] = [date for date, _ in dated]
+        self.sessions: List[Dict[str, Any]] = [session for _, session in dated]
+
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self._by_instructor: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._by_project: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for session in self.sessions:
+            if "session_id" in session:
+                self._by_id[session["session_id"]] = session
+            instructors = session.get("instructor_names") or []
+            if isinstance(instructors, str):
+                instructors = [instructors]
+            for instructor in instructors:
+                self._by_instructor[instructor].append(session)
+            if session.get("project_name"):
+                self._by_project[session["project_name"]].append(session)
+
+    @classmethod
+    def from_payload(cls, response_json: Dict[str, Any]) -> "SessionIndex":
+        """Build an index from a session API response.
+
+        Args:
+            response_json: Parsed JSON response from the API
+
+        Returns:
+            Index over the payload's sessions
+        """
+        return cls(response_json["data"]["sessions"])
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    @property
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """The most recent session, or None if there are no sessions."""
+        return self.sessions[-1] if self.sessions else None
+
+    def newest_first(self) -> List[Dict[str, Any]]:
+        """Return all sessions ordered from most to least recent."""
+        return self.sessions[::-1]
+
+    def get(self, session_id: Any) -> Optional[Dict[str, Any]]:
+        """Look up a session by its ID."""
+        return self._by_id.get(session_id)
+
+    def for_instructor(self, instructor: str) -> List[Dict[str, Any]]:
+        """Return an instructor's sessions, oldest first."""
+        return list(self._by_instructor.get(instructor, []))
+
+    def for_project(self, project_name: str) -> List[Dict[str, Any]]:
+        """Return a project's sessions, oldest first."""
+        return list(self._by_project.get(project_name, []))
+
+    def between(self, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Return sessions dated within [start, end], oldest first.
+
+        Args:
+            start: Earliest session date to include, or None for no lower bound;
+                naive datetimes are taken as UTC
+            end: Latest session date to include, or None for no upper bound
+
+        Returns:
+            Matching sessions
+        """
+        if start is not None and start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end is not None and end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        low = bisect_left(self.dates, start) if start is not None else 0
+        high = bisect_right(self.dates, end) if end is not None else len(self.dates)
+        return self.sessions[low:high]
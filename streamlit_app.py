@@ -8,22 +8,19 @@ This module provides a multi-page interface for:
 """
 
 import streamlit as st
-import requests
-import json
-import os
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Union
 
-from magiclink_chat import process_magic_link, extract_video_id
-from google_integration import get_transcript
-
-# Configure LangChain environment
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
-os.environ["LANGCHAIN_API_KEY"] = st.secrets['LANGCHAIN_API_KEY']
-os.environ["LANGCHAIN_PROJECT"] = "SessionAthena"
-os.environ['LANGCHAIN_ENDPOINT'] = "https://api.smith.langchain.com"
-
-# API endpoint for fetching student session information
-API_BASE_URL = "https://apigateway.navigator.pyxeda.ai/aiclub/one-on-one-student-info"
+from magiclink_chat import extract_video_id
+from google_integration import (
+    INTERACTIVE, PREFETCH, QuotaExceededError, get_transcript, fetch_transcripts, request_priority
+)
+from session_api import SessionAPIError, get_session_api
+from page_cache import memoize_page_load
+from prefetch import get_prefetcher
+from session_index import SessionIndex
+from transcript_store import get_transcript_store
+from tracing import start_trace
+from transcript_view import render_paginated, render_transcript_view
 
 def ensure_list_of_strings(field_value: Union[str, List, None]) -> List[str]:
     """Convert various input types to a list of strings.
@@ -41,20 +38,18 @@ def ensure_list_of_strings(field_value: Union[str, List, None]) -> List[str]:
     else:
         return []
 
-def extract_yt_videos(response: requests.Response) -> List[Dict[str, str]]:
-    """Extract YouTube video information from API response.
+def extract_yt_videos(index: SessionIndex) -> List[Dict[str, str]]:
+    """Extract YouTube video information from the student's sessions.
     
     Args:
-        response: API response containing session data
+        index: Index over the sessions from the API response
         
     Returns:
-        List of dictionaries containing session information
+        List of dictionaries containing session information, newest first
     """
-    rsp = json.loads(response.text)
-    sessions = rsp['data']['sessions']
     final_list = []
     
-    for session in sessions:
+    for session in index.newest_first():
         yt_links = ensure_list_of_strings(session.get("youtube_link", ""))
         if not yt_links:
             continue
@@ -62,6 +57,7 @@ def extract_yt_videos(response: requests.Response) -> List[Dict[str, str]]:
         session_info = {
             'date': session['session_date'],
             'youtube_url': yt_links[0],
+            'youtube_urls': yt_links,
             'youtube_count': len(yt_links),
             'instructors': ", ".join(session['instructor_names']),
             'summary': str(ensure_list_of_strings(session.get("session_summary", ""))),
@@ -71,6 +67,61 @@ def extract_yt_videos(response: requests.Response) -> List[Dict[str, str]]:
         
     return final_list
 
+def store_transcript(video_id: str, transcript_text: str) -> None:
+    """Record a fetched transcript for the other pages.
+    
+    The text goes into the shared transcript store; session state only
+    keeps the video ID.
+    
+    Args:
+        video_id: YouTube video ID
+        transcript_text: Transcript segments joined into one string
+    """
+    get_transcript_store().put(video_id, transcript_text)
+    if 'videos' not in st.session_state:
+        st.session_state['videos'] = []
+    if video_id not in st.session_state['videos']:
+        st.session_state['videos'].append(video_id)
+
+def load_link_transcripts(video_ids: List[str]) -> List[str]:
+    """Fetch transcripts in parallel into the shared store, showing progress.
+    
+    Only the latest video spends YouTube quota reserved for interactive
+    requests; the older ones are fetched afterwards at prefetch priority.
+    
+    Args:
+        video_ids: YouTube video IDs, newest session first
+        
+    Returns:
+        IDs of the videos whose transcripts were fetched
+    """
+    fetched_ids, queued_ids = [], []
+    progress = st.progress(0.0, text=f"Fetching {len(video_ids)} transcripts")
+    done = 0
+    for priority, batch in ((INTERACTIVE, video_ids[:1]), (PREFETCH, video_ids[1:])):
+        with request_priority(priority):
+            for result in fetch_transcripts(batch):
+                if isinstance(result.error, QuotaExceededError):
+                    queued_ids.append(result.video_id)
+                elif result.error is not None:
+                    st.warning(f"Could not fetch transcript for {result.video_id}: {result.error}")
+                else:
+                    store_transcript(result.video_id, "\n".join(result.transcript))
+                    fetched_ids.append(result.video_id)
+                done += 1
+                progress.progress(done / len(video_ids), text=f"Fetched {done} of {len(video_ids)} transcripts")
+    progress.empty()
+    
+    # Out of YouTube quota: fetch the rest in the background once it refills
+    if queued_ids:
+        st.info(f"YouTube quota is used up; {len(queued_ids)} transcripts are queued for later")
+        get_prefetcher().enqueue_videos(queued_ids)
+    
+    # Build the other sessions' indexes in the background
+    get_prefetcher().enqueue_videos(video_id for video_id in video_ids[1:] if video_id in fetched_ids)
+    return fetched_ids
+
+@start_trace("magic_link", state=st.session_state)
 def work_with_ml(link_id: str) -> None:
     """Process magic link and display session information.
     
@@ -78,39 +129,43 @@ def work_with_ml(link_id: str) -> None:
         link_id: Magic link identifier
     """
     st.session_state['magiclink'] = link_id
-    api_url = f"{API_BASE_URL}?linkId={link_id}"
     
-    response = requests.get(api_url)
-    if response.status_code != 200:
-        st.error(f"Error fetching data: {response.status_code}")
+    try:
+        index = get_session_api().fetch_index(link_id)
+    except SessionAPIError as error:
+        st.error(f"Error fetching data: {error.status_code or error}")
         return
         
     # Extract session data
-    sessions = extract_yt_videos(response)
+    sessions = extract_yt_videos(index)
     
     # Display session data in sidebar
     with st.sidebar.expander("Session History"):
-        st.dataframe(sessions)
+        render_paginated(sessions, key="session_history")
     
     # Process only the latest session's video
     if not sessions:
         st.error("No sessions found with video content")
         return
         
-    # Get the latest session (first in the list since they're ordered by date)
-    latest_session = sessions[0]
-    video_url = latest_session['youtube_url']
-    video_id = extract_video_id(video_url)
-    transcript = get_transcript(video_id)
-    
-    # Store in session state
-    if 'videos' not in st.session_state:
-        st.session_state['videos'] = []
-    if video_id not in st.session_state['videos']:
-        st.session_state['videos'].append(video_id)
+    # Fetch transcripts for every video across all sessions, once per link
+    video_ids = list(dict.fromkeys(
+        extract_video_id(url)
+        for session in sessions
+        for url in session['youtube_urls']
+    ))
+    fetched_ids, _ = memoize_page_load(
+        st.session_state, "magic_link_transcripts", link_id,
+        lambda: load_link_transcripts(video_ids)
+    )
     
-    transcript_text = "\n".join(transcript)
-    st.session_state[str(video_id)] = transcript_text
+    # Get the latest session (first in the list since it is sorted newest first)
+    latest_session = sessions[0]
+    video_id = extract_video_id(latest_session['youtube_url'])
+    transcript_text = get_transcript_store().get(video_id) if video_id in fetched_ids else None
+    if transcript_text is None:
+        st.error("Transcript for the latest session is unavailable")
+        return
     
     # Show which session we're analyzing
     st.info(f"Analyzing session from {latest_session['date']}")
@@ -126,8 +181,11 @@ def work_with_ml(link_id: str) -> None:
     
     # Initialize chat interface
     from core_chat import chat_with_transcript_history
-    chat_with_transcript_history(transcript_text, str(latest_session))
+    chat_with_transcript_history(
+        transcript_text, str(latest_session), transcripts={video_id: transcript_text}
+    )
 
+@start_trace("youtube_url", state=st.session_state)
 def work_with_yt(youtube_url: str) -> None:
     """Process YouTube URL and display transcript.
     
@@ -141,15 +199,8 @@ def work_with_yt(youtube_url: str) -> None:
     st.write(f"Video ID: {video_id}")
     
     transcript = get_transcript(video_id)
-    
-    # Store in session state
-    if 'videos' not in st.session_state:
-        st.session_state['videos'] = []
-    if video_id not in st.session_state['videos']:
-        st.session_state['videos'].append(video_id)
-    
     transcript_text = "\n".join(transcript)
-    st.session_state[str(video_id)] = transcript_text
+    store_transcript(video_id, transcript_text)
     
     # Display stats
     st.write(f"Retrieved {len(transcript)} segments totalling {len(transcript_text)} characters")
@@ -188,13 +239,18 @@ def chat_page():
         st.warning("No videos processed yet. Please analyze a video first.")
         return
     
-    # Combine all transcripts
-    transcript_combined = ""
-    for video_id in st.session_state['videos']:
-        transcript_combined += st.session_state[str(video_id)]
+    # Combine all transcripts (memoized in the shared store)
+    store = get_transcript_store()
+    transcript_combined = store.combined(st.session_state['videos'])
+    
+    # Individual transcripts for the map-reduce answer mode
+    transcripts = {
+        video_id: store.get(video_id) for video_id in st.session_state['videos']
+        if video_id in store
+    }
     
     from core_chat import chat_with_transcript_history
-    chat_with_transcript_history(transcript_combined, "")
+    chat_with_transcript_history(transcript_combined, "", transcripts=transcripts)
 
 def debug_yt_page():
     """Debug page for YouTube functionality."""
@@ -204,17 +260,19 @@ def debug_yt_page():
         st.warning("No videos in session state")
         return
     
-    # Display all transcripts
-    transcripts = []
-    for video_id in st.session_state['videos']:
-        transcript = st.session_state[str(video_id)]
-        transcripts.append({
-            'ID': video_id,
-            'Transcript': transcript,
-            'Preview': transcript[:500]
-        })
+    # Display a summary of each stored transcript
+    store = get_transcript_store()
+    transcripts = [
+        info for info in (store.info(video_id) for video_id in st.session_state['videos'])
+        if info is not None
+    ]
     
     st.dataframe(transcripts)
+    
+    # Browse one transcript at a time
+    video_id = st.selectbox("Transcript", st.session_state['videos'])
+    if video_id:
+        render_transcript_view(video_id, key="debug_yt_transcript")
 
 def debug_ml_page():
     """Debug page for Magic Link functionality."""
@@ -241,6 +299,9 @@ def main():
         layout="wide"
     )
     
+    # Start the background prefetcher (and any configured links file)
+    get_prefetcher()
+    
     st.title("Magic Link Analysis")
     
     # Initialize from session state
@@ -0,0 +1,156 @@
+"""Token counting and per-turn token accounting for the chat interface.
+
+This module loads the tokenizer on first use, memoizes counts for long
+texts such as transcripts, and tracks chat message tokens incrementally so
+reruns only count what was appended since the last one.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from tracing import span
+
+if TYPE_CHECKING:
+    import tiktoken
+
+ENCODING_NAME = "cl100k_base"
+# Texts shorter than this are cheaper to encode than to hash and look up
+MEMOIZE_MIN_CHARS = 2048
+MAX_MEMOIZED_COUNTS = 256
+# Per-message framing overhead of the chat completion format
+TOKENS_PER_MESSAGE = 4
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = ENCODING_NAME) -> "tiktoken.Encoding":
+    """Return the tokenizer, loading it (and tiktoken) once per process.
+
+    Args:
+        name: tiktoken encoding name
+
+    Returns:
+        The shared tiktoken encoding
+    """
+    import tiktoken
+
+    return tiktoken.get_encoding(name)
+
+_counts: "OrderedDict[str, int]" = OrderedDict()
+_counts_lock = threading.Lock()
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text, memoizing the result for long texts.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Number of tokens in the text
+    """
+    if len(text) < MEMOIZE_MIN_CHARS:
+        return len(get_encoding().encode_ordinary(text))
+
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    with _counts_lock:
+        count = _counts.get(key)
+        if count is not None:
+            _counts.move_to_end(key)
+            return count
+
+    with span("tokens.count", chars=len(text)):
+        count = len(get_encoding().encode_ordinary(text))
+    with _counts_lock:
+        _counts[key] = count
+        while len(_counts) > MAX_MEMOIZED_COUNTS:
+            _counts.popitem(last=False)
+    return count
+
+class ChatTokenLedger:
+    """Incremental token counts for a chat history plus per-turn usage.
+
+    Keep one ledger per chat (e.g. in ``st.session_state``) and call
+    ``sync`` with the message list on each rerun; only messages appended
+    since the previous call are encoded.
+    """
+
+    def __init__(self):
+        """Create an empty ledger."""
+        self.message_tokens: List[int] = []
+        self.turns: List[Dict[str, int]] = []
+
+    def sync(self, messages: List[Dict[str, Any]]) -> int:
+        """Count any new messages and return the total history tokens.
+
+        Args:
+            messages: Chat messages with 'content' keys, oldest first
+
+        Returns:
+            Tokens for the whole message list including framing overhead
+        """
+        if len(messages) < len(self.message_tokens):
+            # History was cleared or truncated; start over
+            self.message_tokens = []
+        for message in messages[len(self.message_tokens):]:
+            self.message_tokens.append(count_tokens(message["content"]) + TOKENS_PER_MESSAGE)
+        return self.history_tokens
+
+    @property
+    def history_tokens(self) -> int:
+        """Total tokens of the messages counted so far."""
+        return sum(self.message_tokens)
+
+    def record_turn(self, prompt_tokens: int, completion_tokens: int,
+                    cached_tokens: int = 0) -> Dict[str, int]:
+        """Record token usage for one question/answer turn.
+
+        Args:
+            prompt_tokens: Tokens sent to the model
+            completion_tokens: Tokens generated by the model
+            cached_tokens: Prompt tokens the provider served from its
+                prompt cache
+
+        Returns:
+            The recorded turn usage
+        """
+        turn = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens
+        }
+        self.turns.append(turn)
+        return turn
+
+    def totals(self) -> Dict[str, int]:
+        """Sum prompt, cached and completion tokens over all recorded turns."""
+        return {
+            "prompt_tokens": sum(turn["prompt_tokens"] for turn in self.turns),
+            "cached_tokens": sum(turn.get("cached_tokens", 0) for turn in self.turns),
+            "completion_tokens": sum(turn["completion_tokens"] for turn in self.turns),
+            "turns": len(self.turns)
+        }
+
+def usage_from_metadata(usage_metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """Convert LangChain usage metadata into prompt/completion counts.
+
+    Args:
+        usage_metadata: The ``usage_metadata`` of an AIMessage, if any
+
+    Returns:
+        Dictionary with prompt_tokens, cached_tokens (prompt tokens read
+        from the provider's prompt cache) and completion_tokens, or None
+    """
+    if not usage_metadata:
+        return None
+    input_details = usage_metadata.get("input_token_details") or {}
+    return {
+        "prompt_tokens": usage_metadata.get("input_tokens", 0),
+        "cached_tokens": input_details.get("cache_read", 0) or 0,
+        "completion_tokens": usage_metadata.get("output_tokens", 0)
+    }
+
+def cache_hit_rate(usage: Dict[str, int]) -> float:
+    """Return the share of prompt tokens served from the prompt cache."""
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    return usage.get("cached_tokens", 0) / prompt_tokens if prompt_tokens else 0.0
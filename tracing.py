@@ -0,0 +1,346 @@
+"""Lightweight request tracing and latency metrics.
+
+This module times hot paths with the ``span`` context manager or the
+``traced`` decorator. Spans that run inside ``start_trace`` are collected
+into a per-request Trace for the debug timings page. Every span also feeds a
+process-wide latency histogram, which can be scraped in OpenMetrics text
+format. Finished traces can be logged as JSON lines.
+
+Exporters are configured from the environment on first use:
+
+    MAGICLINK_METRICS_PORT  serve /metrics on this local port
+    MAGICLINK_TRACE_LOG     append one JSON line per finished trace to this file
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, NamedTuple, Optional, TypeVar
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRIC_NAME = "magiclink_span_seconds"
+ERROR_METRIC_NAME = "magiclink_span_errors"
+# Finished traces kept per Streamlit session for the debug page
+MAX_SESSION_TRACES = 20
+
+logger = logging.getLogger("magiclink.trace")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+class SpanRecord(NamedTuple):
+    """One finished span within a trace."""
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    offset: float  # Seconds from the start of the trace
+    duration: float
+    attributes: Dict[str, Any]
+    error: Optional[str]
+
+class Trace:
+    """The spans recorded while serving one request (one Streamlit run)."""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        """Start a trace.
+
+        Args:
+            name: Name of the request, such as "magic_link"
+            attributes: Extra fields describing the request
+        """
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attributes = attributes or {}
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[SpanRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: SpanRecord) -> None:
+        """Add a finished span; safe to call from worker threads."""
+        with self._lock:
+            self.spans.append(record)
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """Return the spans as rows ordered by start time.
+
+        Returns:
+            One dictionary per span with its name, nesting depth, start
+            offset and duration in milliseconds, and attributes
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda record: record.offset)
+        parents = {record.span_id: record.parent_id for record in spans}
+
+        def depth(record: SpanRecord) -> int:
+            level, parent = 0, record.parent_id
+            while parent in parents:
+                level, parent = level + 1, parents[parent]
+            return level
+
+        return [
+            {
+                "span": "  " * depth(record) + record.name,
+                "start_ms": round(record.offset * 1000, 1),
+                "duration_ms": round(record.duration * 1000, 1),
+                "error": record.error or "",
+                "attributes": json.dumps(record.attributes, default=str) if record.attributes else ""
+            }
+            for record in spans
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the trace as a JSON-serializable dictionary."""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "spans": [record._asdict() for record in spans]
+        }
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "errors")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+class SpanMetrics:
+    """Process-wide latency histograms per span name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, _Histogram] = {}
+
+    def observe(self, name: str, seconds: float, failed: bool = False) -> None:
+        """Record one span duration."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram()
+            histogram.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram.count += 1
+            histogram.total += seconds
+            if failed:
+                histogram.errors += 1
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Return count, error count and mean duration per span name."""
+        with self._lock:
+            return [
+                {
+                    "span": name,
+                    "count": histogram.count,
+                    "errors": histogram.errors,
+                    "mean_ms": round(histogram.total / histogram.count * 1000, 1)
+                }
+                for name, histogram in sorted(self._histograms.items())
+            ]
+
+    def render_openmetrics(self) -> str:
+        """Render all histograms in OpenMetrics text format."""
+        lines = [
+            f"# TYPE {METRIC_NAME} histogram",
+            f"# UNIT {METRIC_NAME} seconds",
+            f"# HELP {METRIC_NAME} Duration of traced operations.",
+        ]
+        errors = [
+            f"# TYPE {ERROR_METRIC_NAME} counter",
+            f"# HELP {ERROR_METRIC_NAME} Traced operations that raised.",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), histogram.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{METRIC_NAME}_bucket{{span="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_count{{span="{label}"}} {histogram.count}')
+                lines.append(f'{METRIC_NAME}_sum{{span="{label}"}} {histogram.total!r}')
+                errors.append(f'{ERROR_METRIC_NAME}_total{{span="{label}"}} {histogram.errors}')
+        return "\n".join(lines + errors + ["# EOF"]) + "\n"
+
+_metrics: Optional[SpanMetrics] = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> SpanMetrics:
+    """Return the process-wide span metrics, creating them on first use."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = SpanMetrics()
+                _start_exporters()
+    return _metrics
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().render_openmetrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+def _start_exporters() -> None:
+    """Start the exporters requested by environment variables."""
+    log_path = os.environ.get("MAGICLINK_TRACE_LOG")
+    if log_path:
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    port = os.environ.get("MAGICLINK_METRICS_PORT")
+    if port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+        except OSError as error:
+            # Another process (or Streamlit worker) already serves the port
+            logger.warning("Metrics endpoint not started on port %s: %s", port, error)
+        else:
+            threading.Thread(target=server.serve_forever, daemon=True,
+                             name="metrics-endpoint").start()
+
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar(
+    "current_trace", default=None
+)
+_current_span: "contextvars.ContextVar[Optional[int]]" = contextvars.ContextVar(
+    "current_span", default=None
+)
+_span_ids = itertools.count(1)
+
+def record_span(name: str, seconds: float, error: Optional[str] = None,
+                **attributes: Any) -> None:
+    """Record a span that was timed by the caller.
+
+    Useful for work that can't sit inside a with-block, such as a
+    generator consumed by Streamlit.
+
+    Args:
+        name: Span name
+        seconds: Measured duration
+        error: Exception type name if the work failed
+        **attributes: Extra fields to show with the span
+    """
+    get_metrics().observe(name, seconds, error is not None)
+    trace = _current_trace.get()
+    if trace is not None:
+        offset = max(0.0, time.perf_counter() - seconds - trace.start)
+        trace.add(SpanRecord(next(_span_ids), _current_span.get(), name,
+                             offset, seconds, attributes, error))
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """Time the body of a with-block.
+
+    Args:
+        name: Span name, such as "youtube.captions_download"
+        **attributes: Extra fields to show with the span
+
+    Yields:
+        The attributes dictionary, which the body may add fields to
+    """
+    trace = _current_trace.get()
+    parent_id = _current_span.get()
+    span_id = next(_span_ids)
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        get_metrics().observe(name, duration, error is not None)
+        if trace is not None:
+            trace.add(SpanRecord(span_id, parent_id, name, start - trace.start,
+                                 duration, attributes, error))
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator that wraps every call of a function in a span.
+
+    Args:
+        name: Span name; defaults to the function's qualified name
+    """
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+@contextmanager
+def start_trace(name: str, state: Optional[MutableMapping[str, Any]] = None,
+                **attributes: Any) -> Iterator[Trace]:
+    """Collect the spans of one request into a Trace.
+
+    Also usable as a decorator, tracing every call of the function.
+
+    Args:
+        name: Name of the request
+        state: Mapping (such as st.session_state) whose "traces" list
+            receives the finished trace
+        **attributes: Extra fields describing the request
+
+    Yields:
+        The active Trace
+    """
+    trace = Trace(name, attributes)
+    token = _current_trace.set(trace)
+    try:
+        with span(name, **attributes):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.duration = time.perf_counter() - trace.start
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(trace.to_dict(), default=str))
+        if state is not None:
+            traces = state.setdefault("traces", [])
+            traces.append(trace)
+            del traces[:-MAX_SESSION_TRACES]
+
+def bind(func: F) -> F:
+    """Bind a function to the current trace for running on another thread.
+
+    Thread pools don't inherit context variables, so work submitted to an
+    executor would otherwise be timed without being added to the trace.
+
+    Args:
+        func: Function to run later, possibly on a worker thread
+
+    Returns:
+        Function that runs ``func`` in a copy of the caller's context
+    """
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func)  # type: ignore[return-value]
@@ -0,0 +1,204 @@
+"""Two-tier cache for downloaded YouTube caption tracks.
+
+This module keeps caption payloads in an in-process LRU tier in front of the
+shared cache backend (a SQLite file by default, or a Redis server shared by
+every replica), so Streamlit reruns, restarts and other app processes can
+serve transcripts without calling the YouTube Data API again.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from cache_backend import CacheBackend, get_cache_backend
+
+# Default cache settings
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # One week
+DEFAULT_MEMORY_ENTRIES = 64
+
+# Backend namespaces: caption payloads, and the latest caption ID of each video
+TRANSCRIPT_NAMESPACE = "transcript"
+LATEST_CAPTION_NAMESPACE = "transcript_latest"
+
+logger = logging.getLogger(__name__)
+
+class TranscriptCache:
+    """LRU memory cache in front of a cache backend, keyed by video and caption ID.
+
+    Entries older than ``ttl_seconds`` are treated as misses. Each video also
+    remembers the caption ID it was last stored under, so a lookup by video
+    ID alone can be answered before the captions are listed.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        """Create the cache.
+
+        Args:
+            backend: Shared tier behind process memory, or None to keep
+                transcripts in this process only
+            ttl_seconds: Maximum age of an entry before it is refetched
+            max_memory_entries: Number of transcripts kept in process memory
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._latest_caption: Dict[str, str] = {}
+        self._stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, video_id: str, caption_id: Optional[str] = None) -> Optional[str]:
+        """Look up a cached caption payload.
+
+        Args:
+            video_id: YouTube video ID
+            caption_id: Caption track ID, or None for the most recently stored track
+
+        Returns:
+            The raw caption text, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            if caption_id is None:
+                caption_id = self._latest_caption.get(video_id)
+
+            # Memory tier
+            if caption_id is not None:
+                entry = self._memory.get((video_id, caption_id))
+                if entry is not None:
+                    created_at, caption_text = entry
+                    if now - created_at <= self.ttl_seconds:
+                        self._memory.move_to_end((video_id, caption_id))
+                        self._stats["memory_hits"] += 1
+                        return caption_text
+                    del self._memory[(video_id, caption_id)]
+
+        # Shared tier, outside the lock since it may be a network round trip
+        row = self._load_shared(video_id, caption_id, now)
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            caption_id, created_at, caption_text = row
+            self._remember(video_id, caption_id, created_at, caption_text)
+            self._stats["shared_hits"] += 1
+            return caption_text
+
+    def contains(self, video_id: str) -> bool:
+        """Check whether a video has a cached track, without touching counters.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            True if a non-expired track is cached in either tier
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            caption_id = self._latest_caption.get(video_id)
+            entry = self._memory.get((video_id, caption_id)) if caption_id else None
+            if entry is not None and entry[0] >= cutoff:
+                return True
+        if self.backend is None:
+            return False
+        return self.backend.exists(LATEST_CAPTION_NAMESPACE, video_id)
+
+    def put(self, video_id: str, caption_id: str, caption_text: str) -> None:
+        """Store a caption payload in both tiers.
+
+        Args:
+            video_id: YouTube video ID
+            caption_id: Caption track ID the payload was downloaded from
+            caption_text: Raw caption text
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(video_id, caption_id, now, caption_text)
+        if self.backend is None:
+            return
+        # The creation time travels with the payload, so every process expires it together
+        payload = f"{now!r}\n{caption_text}".encode("utf-8")
+        self.backend.set(TRANSCRIPT_NAMESPACE, f"{video_id}:{caption_id}", payload, self.ttl_seconds)
+        self.backend.set(LATEST_CAPTION_NAMESPACE, video_id, caption_id.encode("utf-8"), self.ttl_seconds)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the memory tier size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["hits"] = stats["memory_hits"] + stats["shared_hits"]
+            stats["memory_entries"] = len(self._memory)
+            return stats
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._latest_caption.clear()
+        if self.backend is not None:
+            self.backend.clear(TRANSCRIPT_NAMESPACE)
+            self.backend.clear(LATEST_CAPTION_NAMESPACE)
+
+    def _remember(self, video_id: str, caption_id: str,
+                  created_at: float, caption_text: str) -> None:
+        """Insert into the memory tier, evicting least recently used entries."""
+        self._memory[(video_id, caption_id)] = (created_at, caption_text)
+        self._memory.move_to_end((video_id, caption_id))
+        self._latest_caption[video_id] = caption_id
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _load_shared(self, video_id: str, caption_id: Optional[str],
+                     now: float) -> Optional[Tuple[str, float, str]]:
+        """Read a non-expired entry from the backend.
+
+        Unreadable entries, which any replica could have written, are
+        deleted and treated as misses.
+        """
+        if self.backend is None:
+            return None
+
+        if caption_id is None:
+            latest = self.backend.get(LATEST_CAPTION_NAMESPACE, video_id)
+            if latest is None:
+                return None
+            try:
+                caption_id = latest.decode("utf-8")
+            except ValueError as error:
+                logger.warning("Dropping unreadable latest caption ID of %s: %s", video_id, error)
+                self.backend.delete(LATEST_CAPTION_NAMESPACE, video_id)
+                return None
+
+        key = f"{video_id}:{caption_id}"
+        payload = self.backend.get(TRANSCRIPT_NAMESPACE, key)
+        if payload is None:
+            return None
+        try:
+            header, separator, caption_text = payload.decode("utf-8").partition("\n")
+            if not separator:
+                raise ValueError("missing creation time")
+            created_at = float(header)
+        except ValueError as error:
+            logger.warning("Dropping unreadable cached transcript %s: %s", key, error)
+            self.backend.delete(TRANSCRIPT_NAMESPACE, key)
+            return None
+        if now - created_at > self.ttl_seconds:
+            return None
+        return caption_id, created_at, caption_text
+
+_cache: Optional[TranscriptCache] = None
+_cache_lock = threading.Lock()
+
+def get_transcript_cache() -> TranscriptCache:
+    """Return the process-wide transcript cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TranscriptCache(backend=get_cache_backend())
+    return _cache
@@ -0,0 +1,227 @@
+"""Process-wide store for fetched transcript text.
+
+This module keeps each transcript once per process, compressed and shared by
+every Streamlit session, so session state only needs to hold video IDs.
+Identical transcripts are stored once, and decompressed or combined views
+are memoized in small bounded caches. The store itself is capped; a
+transcript evicted from it is reloaded from the transcript cache when a
+session asks for it again.
+"""
+
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Store settings
+MAX_DECODED_TRANSCRIPTS = 16
+MAX_COMBINED_VIEWS = 8
+MAX_STORED_TRANSCRIPTS = 256
+MAX_STORED_BYTES = 64 * 1024 * 1024  # Compressed
+PREVIEW_CHARS = 500
+
+class TranscriptStore:
+    """Compressed, deduplicated transcript text keyed by video ID.
+
+    Least recently used videos are evicted once the store holds more than
+    ``max_transcripts`` videos or ``max_bytes`` of compressed text.
+    """
+
+    def __init__(self, max_decoded: int = MAX_DECODED_TRANSCRIPTS,
+                 max_combined: int = MAX_COMBINED_VIEWS,
+                 max_transcripts: int = MAX_STORED_TRANSCRIPTS,
+                 max_bytes: int = MAX_STORED_BYTES,
+                 loader: Optional[Callable[[str], Optional[str]]] = None):
+        """Create an empty store.
+
+        Args:
+            max_decoded: Number of decompressed transcripts kept hot
+            max_combined: Number of combined multi-video views kept hot
+            max_transcripts: Number of videos kept
+            max_bytes: Compressed bytes kept
+            loader: Function returning the text of a video that is not
+                stored (for example after eviction), or None
+        """
+        self.max_decoded = max_decoded
+        self.max_combined = max_combined
+        self.max_transcripts = max_transcripts
+        self.max_bytes = max_bytes
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._digests: "OrderedDict[str, str]" = OrderedDict()  # video ID -> content digest
+        self._blobs: Dict[str, Tuple[bytes, int]] = {}  # digest -> (compressed, length)
+        self._blob_bytes = 0
+        self._decoded: "OrderedDict[str, str]" = OrderedDict()
+        self._combined: "OrderedDict[Tuple[str, ...], str]" = OrderedDict()
+
+    def put(self, video_id: str, transcript_text: str) -> str:
+        """Store a transcript, sharing storage with identical content.
+
+        Args:
+            video_id: YouTube video ID
+            transcript_text: Transcript text
+
+        Returns:
+            Content digest of the transcript
+        """
+        digest = hashlib.sha1(transcript_text.encode("utf-8")).hexdigest()
+        with self._lock:
+            if self._digests.get(video_id) == digest:
+                self._digests.move_to_end(video_id)
+                return digest
+            if digest not in self._blobs:
+                compressed = zlib.compress(transcript_text.encode("utf-8"))
+                self._blobs[digest] = (compressed, len(transcript_text))
+                self._blob_bytes += len(compressed)
+            old_digest = self._digests.get(video_id)
+            self._digests[video_id] = digest
+            self._digests.move_to_end(video_id)
+            if old_digest is not None:
+                self._release(old_digest)
+            self._remember_decoded(digest, transcript_text)
+            self._evict()
+        return digest
+
+    def get(self, video_id: str) -> Optional[str]:
+        """Return a transcript's text, or None if it is neither stored nor loadable."""
+        with self._lock:
+            digest = self._digests.get(video_id)
+            if digest is not None:
+                self._digests.move_to_end(video_id)
+        if digest is None:
+            text = self._loader(video_id) if self._loader is not None else None
+            if text is not None:
+                self.put(video_id, text)
+            return text
+
+        with self._lock:
+            blob = self._blobs.get(digest)
+            text = self._decoded.get(digest) if blob is not None else None
+            if text is not None:
+                self._decoded.move_to_end(digest)
+                return text
+        if blob is None:
+            # Evicted by another thread in the meantime
+            return self.get(video_id)
+        compressed, _ = blob
+
+        text = zlib.decompress(compressed).decode("utf-8")
+        with self._lock:
+            self._remember_decoded(digest, text)
+        return text
+
+    def combined(self, video_ids: Iterable[str], separator: str = "\n") -> str:
+        """Return the stored transcripts of several videos joined together.
+
+        The joined string is memoized per combination of transcript
+        contents, so reruns reuse it instead of rebuilding it.
+
+        Args:
+            video_ids: Video IDs in the order to combine; unknown IDs are skipped
+            separator: Text placed between transcripts
+
+        Returns:
+            Combined transcript text
+        """
+        video_ids = list(video_ids)
+        # Reload evicted transcripts first, so they are part of the view
+        for video_id in video_ids:
+            if video_id not in self._digests:
+                self.get(video_id)
+        with self._lock:
+            key = tuple(self._digests[v] for v in video_ids if v in self._digests) + (separator,)
+            text = self._combined.get(key)
+            if text is not None:
+                self._combined.move_to_end(key)
+                return text
+
+        text = separator.join(
+            transcript for transcript in (self.get(v) for v in video_ids) if transcript is not None
+        )
+        with self._lock:
+            self._combined[key] = text
+            while len(self._combined) > self.max_combined:
+                self._combined.popitem(last=False)
+        return text
+
+    def info(self, video_id: str) -> Optional[Dict[str, object]]:
+        """Describe a stored transcript without copying its full text.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            Dictionary with character count, compressed size and a preview,
+            or None if the transcript is not stored
+        """
+        text = self.get(video_id)
+        if text is None:
+            return None
+        with self._lock:
+            digest = self._digests.get(video_id)
+            blob = self._blobs.get(digest) if digest is not None else None
+        if blob is None:
+            return None
+        compressed, length = blob
+        return {
+            "ID": video_id,
+            "Characters": length,
+            "Compressed bytes": len(compressed),
+            "Preview": text[:PREVIEW_CHARS]
+        }
+
+    def __contains__(self, video_id: str) -> bool:
+        with self._lock:
+            if video_id in self._digests:
+                return True
+        return self.get(video_id) is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of stored videos and their compressed size."""
+        with self._lock:
+            return {"transcripts": len(self._digests), "compressed_bytes": self._blob_bytes}
+
+    def _release(self, digest: str) -> None:
+        """Drop a transcript's text once no video refers to it."""
+        if digest in self._digests.values():
+            return
+        compressed, _ = self._blobs.pop(digest)
+        self._blob_bytes -= len(compressed)
+        self._decoded.pop(digest, None)
+
+    def _evict(self) -> None:
+        """Evict least recently used videos over the entry or byte cap."""
+        while len(self._digests) > self.max_transcripts or (
+            self._blob_bytes > self.max_bytes and len(self._digests) > 1
+        ):
+            _, digest = self._digests.popitem(last=False)
+            self._release(digest)
+
+    def _remember_decoded(self, digest: str, text: str) -> None:
+        """Keep a decompressed transcript hot, evicting the least recent."""
+        self._decoded[digest] = text
+        self._decoded.move_to_end(digest)
+        while len(self._decoded) > self.max_decoded:
+            self._decoded.popitem(last=False)
+
+_store: Optional[TranscriptStore] = None
+_store_lock = threading.Lock()
+
+def get_transcript_store() -> TranscriptStore:
+    """Return the process-wide transcript store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TranscriptStore(loader=_load_cached_transcript)
+    return _store
+
+def _load_cached_transcript(video_id: str) -> Optional[str]:
+    """Rebuild a transcript's text from the transcript cache, without calling YouTube."""
+    # Imported here because google_integration is slow to import
+    from google_integration import parse_transcript_text
+    from transcript_cache import get_transcript_cache
+
+    caption_text = get_transcript_cache().get(video_id)
+    return "\n".join(parse_transcript_text(caption_text)) if caption_text is not None else None
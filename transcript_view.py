@@ -0,0 +1,187 @@
+"""Windowed Streamlit views of long transcripts and session histories.
+
+This module renders transcripts one page at a time from a cached per-video
+segment index, with time-range filtering and text search, so only the
+visible slice is sent to the browser on each rerun.
+"""
+
+import hashlib
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import streamlit as st
+
+from caption_parser import CaptionSegment, format_timestamp, parse_captions
+from google_integration import get_caption_text
+from tracing import span
+
+# View settings
+DEFAULT_PAGE_SIZE = 50
+MAX_CACHED_SEGMENT_INDEXES = 32
+MAX_CACHED_FILTERS = 16
+
+class SegmentIndex:
+    """Parallel arrays over one video's caption segments for fast slicing."""
+
+    def __init__(self, segments: List[CaptionSegment]):
+        """Build the index.
+
+        Args:
+            segments: Caption segments in time order
+        """
+        self.starts = [segment.start_ms for segment in segments]
+        self.texts = [segment.text for segment in segments]
+        self._lowered = [text.lower() for text in self.texts]
+        self.duration_ms = segments[-1].end_ms if segments else 0
+        self._lock = threading.Lock()
+        self._filters: "OrderedDict[Tuple[int, int, str], List[int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def filter(self, start_ms: int, end_ms: int, query: str = "") -> List[int]:
+        """Return positions of segments starting in a time range and matching a query.
+
+        Results are memoized per (range, query), so paging through them on
+        later reruns is a list slice.
+
+        Args:
+            start_ms: Earliest segment start to include
+            end_ms: Latest segment start to include
+            query: Case-insensitive text to search for, or "" for all segments
+
+        Returns:
+            Segment positions in time order
+        """
+        query = query.strip().lower()
+        key = (start_ms, end_ms, query)
+        with self._lock:
+            positions = self._filters.get(key)
+            if positions is not None:
+                self._filters.move_to_end(key)
+                return positions
+
+        low = bisect_left(self.starts, start_ms)
+        high = bisect_right(self.starts, end_ms)
+        if query:
+            positions = [i for i in range(low, high) if query in self._lowered[i]]
+        else:
+            positions = list(range(low, high))
+
+        with self._lock:
+            self._filters[key] = positions
+            while len(self._filters) > MAX_CACHED_FILTERS:
+                self._filters.popitem(last=False)
+        return positions
+
+    def rows(self, positions: Sequence[int], video_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Build display rows for the given segment positions.
+
+        Args:
+            positions: Segment positions to render
+            video_id: YouTube video ID used to build jump-to-time links
+
+        Returns:
+            One dictionary per segment
+        """
+        rows = []
+        for i in positions:
+            row = {"Time": format_timestamp(self.starts[i]), "Text": self.texts[i]}
+            if video_id:
+                row["Link"] = f"https://youtu.be/{video_id}?t={self.starts[i] // 1000}"
+            rows.append(row)
+        return rows
+
+_indexes: "OrderedDict[str, Tuple[str, SegmentIndex]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_segment_index(video_id: str) -> SegmentIndex:
+    """Return the segment index for a video, building it once per caption text.
+
+    The index is keyed on a digest of the cached caption text, so it is
+    rebuilt when the transcript cache picks up a new caption track.
+
+    Args:
+        video_id: YouTube video ID
+
+    Returns:
+        Cached SegmentIndex for the video's transcript
+    """
+    caption_text = get_caption_text(video_id)
+    digest = hashlib.sha1(caption_text.encode("utf-8")).hexdigest()
+    with _indexes_lock:
+        entry = _indexes.get(video_id)
+        if entry is not None and entry[0] == digest:
+            _indexes.move_to_end(video_id)
+            return entry[1]
+
+    with span("captions.parse", chars=len(caption_text)):
+        index = SegmentIndex(parse_captions(caption_text))
+    with _indexes_lock:
+        _indexes[video_id] = (digest, index)
+        _indexes.move_to_end(video_id)
+        while len(_indexes) > MAX_CACHED_SEGMENT_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+def _page_slice(count: int, key: str, page_size: int) -> slice:
+    """Show a page selector when needed and return the selected page's slice."""
+    pages = max(1, math.ceil(count / page_size))
+    page = 1
+    if pages > 1:
+        # The page lives in session state only, so it can be clamped below
+        # without also giving the widget a default value
+        st.session_state.setdefault(f"{key}_page", 1)
+        # Filters may shrink the result; keep a remembered page in range
+        if st.session_state[f"{key}_page"] > pages:
+            st.session_state[f"{key}_page"] = pages
+        page = st.number_input(
+            f"Page (of {pages})", min_value=1, max_value=pages, key=f"{key}_page"
+        )
+    first = (page - 1) * page_size
+    return slice(first, first + page_size)
+
+def render_paginated(rows: Sequence[Any], key: str,
+                     page_size: int = DEFAULT_PAGE_SIZE, **dataframe_args: Any) -> None:
+    """Render one page of rows with a page selector.
+
+    Args:
+        rows: All rows; only the selected page is sent to the browser
+        key: Unique widget key prefix
+        page_size: Rows per page
+        **dataframe_args: Extra arguments for st.dataframe
+    """
+    page = _page_slice(len(rows), key, page_size)
+    st.dataframe(rows[page], **dataframe_args)
+    if len(rows) > page_size:
+        st.caption(f"Rows {page.start + 1}-{min(page.stop, len(rows))} of {len(rows)}")
+
+def render_transcript_view(video_id: str, key: str, page_size: int = DEFAULT_PAGE_SIZE) -> None:
+    """Render a searchable, time-filtered, paginated transcript view.
+
+    Args:
+        video_id: YouTube video ID whose transcript to show
+        key: Unique widget key prefix
+        page_size: Segments per page
+    """
+    index = get_segment_index(video_id)
+    if not len(index):
+        st.write("Transcript is empty")
+        return
+
+    total_minutes = max(1, math.ceil(index.duration_ms / 60000))
+    start_minute, end_minute = st.slider(
+        "Time range (minutes)", 0, total_minutes, (0, total_minutes), key=f"{key}_range"
+    )
+    query = st.text_input("Search transcript", key=f"{key}_search")
+
+    positions = index.filter(start_minute * 60000, end_minute * 60000, query)
+    st.dataframe(
+        index.rows(positions[_page_slice(len(positions), key, page_size)], video_id),
+        hide_index=True,
+        column_config={"Link": st.column_config.LinkColumn("Link", display_text="Open")}
+    )
+    st.caption(f"{len(positions)} of {len(index)} segments match")